@@ -0,0 +1,73 @@
+"""Throughput of independent runs as the CPU budget grows from 1 to N.
+
+Each point splits ``cores`` CPUs into ``cores`` single-threaded workers, the
+layout ``Concurrency.for_cpus`` picks for side-by-side jobs, and times a fixed
+number of batched simulation + inference jobs through ``Concurrency.executor``.
+Throughput should grow with the budget; a point slower than the one before it
+is reported as a regression and makes the script exit non-zero.
+
+    python benchmarks/scaling.py --jobs 32 --max-cores 8
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+import numpy as np
+
+from concurrency import Concurrency, available_cpus
+from nn import draw_parameters, parameter_dtype
+from quantum_circuit_qiskit import create_circuit, simulate_circuits
+from weight_bank import ensemble_forward
+
+_BATCH = 16  # circuits per simulator submission
+_SHOTS = 8192
+
+
+def _job(seed: int) -> int:
+    """One unit of work: a batch of simulations, then inference on each."""
+    rng = np.random.default_rng(seed)
+    results = simulate_circuits([create_circuit(3, 3)] * _BATCH, _SHOTS, rng)
+    layout = parameter_dtype()
+    params = np.stack([draw_parameters(rng, layout) for _ in results])
+    inputs = np.array([r.probabilities_vector for r in results])
+    return int(ensemble_forward(params, inputs).argmax(axis=1).sum())
+
+
+def _throughput(cores: int, jobs: int) -> float:
+    concurrency = Concurrency.for_cpus(workers=cores, cpus=cores)
+    with concurrency.executor() as pool:
+        pool.submit(_job, 0).result()  # spawn and import before timing
+        start = time.perf_counter()
+        list(pool.map(_job, range(jobs)))
+        return jobs * _BATCH / (time.perf_counter() - start)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--jobs", type=int, default=32)
+    parser.add_argument("--max-cores", type=int, default=available_cpus())
+    args = parser.parse_args()
+
+    print(f"{'cores':>5}  {'runs/s':>9}  {'speedup':>7}")
+    baseline = previous = 0.0
+    regressions = 0
+    for cores in range(1, args.max_cores + 1):
+        rate = _throughput(cores, args.jobs)
+        baseline = baseline or rate
+        flag = ""
+        if rate < previous * 0.95:  # allow for timing noise
+            flag = "  <- regression"
+            regressions += 1
+        print(f"{cores:>5}  {rate:>9.1f}  {rate / baseline:>6.2f}x{flag}")
+        previous = rate
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
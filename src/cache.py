@@ -0,0 +1,154 @@
+"""Disk-backed cache of pipeline stage outputs.
+
+With explicit seeds every stage is a pure function of its inputs, so its output
+can be stored under a hash of those inputs and reused: re-rendering with a new
+palette or template, or resuming an interrupted sweep, then skips simulation
+and inference entirely.
+
+Entries are pydantic JSON files under ``<directory>/<stage>/<key>.json``. The
+cache is bounded by total size and evicts least recently used entries first;
+a hit refreshes the entry's mtime, which is what recency is measured by. Each
+cache keeps a running index of entry sizes, so a write only lists the
+directory when that index says the bound is exceeded.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from typing import TYPE_CHECKING, Any
+
+from pydantic import BaseModel, ValidationError
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+    import numpy as np
+
+# Bump whenever a stage's output for the same inputs changes, so entries
+# written by older code stop matching instead of being served stale.
+CACHE_VERSION = 3
+
+DEFAULT_MAX_BYTES = 256 * 2**20
+
+
+def seed_key(seq: np.random.SeedSequence) -> list[Any]:
+    """Extract the parts of a ``SeedSequence`` that determine its stream."""
+    return [seq.entropy, list(seq.spawn_key), seq.pool_size]
+
+
+def cache_key(*parts: Any) -> str:
+    """Hash JSON-serializable ``parts`` into a stable hex key."""
+    payload = json.dumps([CACHE_VERSION, *parts], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class ResultCache:
+    """Size-bounded LRU store of stage outputs keyed by their inputs."""
+
+    def __init__(self, directory: Path, max_bytes: int = DEFAULT_MAX_BYTES):
+        """Open (or create) a cache rooted at ``directory``.
+
+        Parameters
+        ----------
+        directory : Path
+            Where entries are stored; created on first write
+        max_bytes : int
+            Total size the cache is trimmed back to after every write
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        # Entry sizes and their sum, read from disk on the first write
+        self._sizes: dict[Path, int] = {}
+        self._total = 0
+        self._scanned = False
+
+    def _path(self, stage: str, key: str) -> Path:
+        return self.directory / stage / f"{key}.json"
+
+    def get[M: BaseModel](self, stage: str, key: str, model: type[M]) -> M | None:
+        """Return the cached ``stage`` output for ``key``, or None on a miss.
+
+        Parameters
+        ----------
+        stage : str
+            Name of the pipeline stage
+        key : str
+            Hash of the stage's inputs, from ``cache_key``
+        model : type[M]
+            The pydantic model the entry was stored as
+
+        Returns
+        -------
+        M | None
+            The stored output. Unreadable or outdated entries count as misses.
+        """
+        path = self._path(stage, key)
+        try:
+            value = model.model_validate_json(path.read_bytes())
+        except (OSError, ValidationError):
+            return None
+        try:
+            os.utime(path)  # mark as recently used
+        except OSError:
+            pass  # evicted meanwhile; the value read is still good
+        return value
+
+    def put(self, stage: str, key: str, value: BaseModel) -> None:
+        """Store ``value`` as the ``stage`` output for ``key`` and trim the cache.
+
+        The entry is written to a temporary file and renamed into place, so a
+        crash mid-write never leaves a truncated entry for ``get`` to read, and
+        a failed write leaves no temporary file behind.
+        """
+        path = self._path(stage, key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        payload = value.model_dump_json().encode()
+        fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(payload)
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+        self._account(path, len(payload))
+
+    def _account(self, path: Path, size: int) -> None:
+        """Add a written entry to the size index, evicting if it overflows."""
+        with self._lock:
+            if not self._scanned:
+                self._scan()
+            self._total += size - self._sizes.get(path, 0)
+            self._sizes[path] = size
+            if self._total > self.max_bytes:
+                self._evict()
+
+    def _scan(self) -> list[tuple[float, int, Path]]:
+        """List every entry on disk and rebuild the size index from them."""
+        entries = []
+        for path in self.directory.glob("*/*.json"):
+            try:
+                st = path.stat()
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+        self._sizes = {path: size for _, size, path in entries}
+        self._total = sum(self._sizes.values())
+        self._scanned = True
+        return entries
+
+    def _evict(self) -> None:
+        """Delete least recently used entries until the cache fits."""
+        # Rescanned rather than trusted: other processes may share the directory.
+        entries = self._scan()
+        for _, size, path in sorted(entries, key=lambda e: e[0]):
+            if self._total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            del self._sizes[path]
+            self._total -= size
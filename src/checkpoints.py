@@ -0,0 +1,144 @@
+"""Reuse the statevector of a circuit's unchanged prefix.
+
+Circuits here are built in barrier-separated layers, and sweeps usually vary a
+late one, e.g. the ``ry`` angle and the Toffoli after the H/CX opening. Evolving
+every variant from |0...0⟩ repeats the shared prefix each time.
+``StateCheckpoints`` keeps the state after each layer, keyed by a hash chain
+over the layers so far: layer ``i``'s key hashes layer ``i``'s gates together
+with layer ``i - 1``'s key, so equal keys mean equal prefixes. Evolving a
+circuit resumes from its deepest cached layer and only applies the rest, so a
+sweep's cost shrinks in proportion to the depth it leaves unchanged.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import TYPE_CHECKING
+
+import numpy as np
+from qiskit import QuantumCircuit
+from qiskit.quantum_info import Statevector
+
+if TYPE_CHECKING:
+    from qiskit.circuit import CircuitInstruction
+
+DEFAULT_MAX_BYTES = 64 * 2**20  # 64 layers of a 16-qubit circuit
+
+# Not unitary, or (barriers) only there to delimit layers
+_SKIPPED = frozenset({"measure", "barrier"})
+
+
+def _layers(circuit: QuantumCircuit) -> list[list[CircuitInstruction]]:
+    """Split the unitary part of ``circuit`` at its barriers."""
+    layers: list[list[CircuitInstruction]] = [[]]
+    for instruction in circuit.data:
+        name = instruction.operation.name
+        if name == "barrier" and layers[-1]:
+            layers.append([])
+        elif name not in _SKIPPED:
+            layers[-1].append(instruction)
+    return [layer for layer in layers if layer]
+
+
+def _parameter_bytes(value: object) -> bytes:
+    try:
+        return np.asarray(value, dtype=np.complex128).tobytes()
+    except TypeError:
+        # Unbound parameters cannot be simulated anyway; leave that error to
+        # Statevector, which explains it better.
+        return repr(value).encode()
+
+
+class StateCheckpoints:
+    """A size-bounded LRU cache of statevectors after each layer of a circuit."""
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES):
+        """Create an empty cache holding at most ``max_bytes`` of amplitudes."""
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.layers_evolved = 0
+        self.layers_reused = 0
+        self._states: OrderedDict[bytes, Statevector] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _keys(
+        self, circuit: QuantumCircuit, layers: list[list[CircuitInstruction]]
+    ) -> list[bytes]:
+        key = hashlib.sha256(f"qubits={circuit.num_qubits}".encode()).digest()
+        keys = []
+        for layer in layers:
+            digest = hashlib.sha256(key)
+            for instruction in layer:
+                digest.update(instruction.operation.name.encode())
+                for value in instruction.operation.params:
+                    digest.update(_parameter_bytes(value))
+                for qubit in instruction.qubits:
+                    digest.update(circuit.find_bit(qubit).index.to_bytes(4))
+                digest.update(b";")
+            key = digest.digest()
+            keys.append(key)
+        return keys
+
+    def _resume(self, keys: list[bytes]) -> tuple[int, Statevector | None]:
+        """Find the deepest cached layer; return its depth and state."""
+        with self._lock:
+            for depth in range(len(keys), 0, -1):
+                state = self._states.get(keys[depth - 1])
+                if state is not None:
+                    self._states.move_to_end(keys[depth - 1])
+                    return depth, state
+        return 0, None
+
+    def _store(self, key: bytes, state: Statevector) -> None:
+        if state.data.nbytes > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._states.pop(key, None)
+            if previous is not None:
+                self.nbytes -= previous.data.nbytes
+            self._states[key] = state
+            self.nbytes += state.data.nbytes
+            while self.nbytes > self.max_bytes:
+                _, evicted = self._states.popitem(last=False)
+                self.nbytes -= evicted.data.nbytes
+
+    def evolve(self, circuit: QuantumCircuit) -> Statevector:
+        """Return the state ``circuit`` prepares from |0...0⟩, before measurement.
+
+        Parameters
+        ----------
+        circuit : QuantumCircuit
+            A circuit with all parameters bound; measurements are ignored
+
+        Returns
+        -------
+        Statevector
+            The final state. It is shared with the cache; ``Statevector``
+            operations return new objects, so it is not modified in use.
+        """
+        layers = _layers(circuit)
+        keys = self._keys(circuit, layers)
+        depth, state = self._resume(keys)
+        self.layers_reused += depth
+        if state is None:
+            state = Statevector.from_int(0, 2**circuit.num_qubits)
+
+        for layer, key in zip(layers[depth:], keys[depth:], strict=True):
+            segment = QuantumCircuit(circuit.num_qubits)
+            for instruction in layer:
+                segment.append(
+                    instruction.operation,
+                    [circuit.find_bit(q).index for q in instruction.qubits],
+                )
+            state = state.evolve(segment)
+            self._store(key, state)
+            self.layers_evolved += 1
+        return state
+
+    def clear(self) -> None:
+        """Drop every checkpoint."""
+        with self._lock:
+            self._states.clear()
+            self.nbytes = 0
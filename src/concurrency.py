@@ -0,0 +1,156 @@
+"""One place to decide how many CPUs the pipeline uses, and how.
+
+Aer, NumPy's BLAS and any worker pool each default to every core they can see,
+so a few jobs sharing a node oversubscribe it many times over. ``Concurrency``
+splits one CPU budget between them: ``workers`` independent runs side by side,
+each allowed ``threads`` threads for Aer, BLAS and its pipeline stages. The
+budget defaults to what the process may actually use, i.e. its affinity mask
+capped by the cgroup CPU quota, not the host's core count.
+
+``configure`` installs a budget for this process, limiting BLAS libraries that
+are already loaded through ``threadpoolctl`` and any loaded later through the
+environment. Worker pools come from ``Concurrency.executor``, whose processes
+install the budget themselves before running a task.
+"""
+
+from __future__ import annotations
+
+import math
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+from threadpoolctl import threadpool_limits
+
+# Every thread-count variable the common BLAS and OpenMP runtimes read at load
+BLAS_ENV_VARS = (
+    "OMP_NUM_THREADS",
+    "OPENBLAS_NUM_THREADS",
+    "MKL_NUM_THREADS",
+    "BLIS_NUM_THREADS",
+    "VECLIB_MAXIMUM_THREADS",
+    "NUMEXPR_NUM_THREADS",
+)
+
+CGROUP_ROOT = Path("/sys/fs/cgroup")
+
+
+def _cgroup_cpu_quota() -> float | None:
+    """CPUs allowed by the cgroup CPU quota, or None when unlimited."""
+    try:  # cgroup v2: "<quota> <period>" or "max <period>"
+        quota, period = (CGROUP_ROOT / "cpu.max").read_text().split()
+        return None if quota == "max" else int(quota) / int(period)
+    except (OSError, ValueError):
+        pass
+    try:  # cgroup v1: quota is -1 when unlimited
+        quota_us = int((CGROUP_ROOT / "cpu" / "cpu.cfs_quota_us").read_text())
+        period_us = int((CGROUP_ROOT / "cpu" / "cpu.cfs_period_us").read_text())
+        return None if quota_us <= 0 else quota_us / period_us
+    except (OSError, ValueError):
+        return None
+
+
+def available_cpus() -> int:
+    """Count the CPUs this process can really use.
+
+    Returns
+    -------
+    int
+        The size of the affinity mask, capped by the cgroup CPU quota rounded
+        down, and never less than 1.
+    """
+    cpus = os.process_cpu_count() or 1
+    quota = _cgroup_cpu_quota()
+    if quota is not None:
+        cpus = min(cpus, math.floor(quota))
+    return max(1, cpus)
+
+
+@dataclass(frozen=True)
+class Concurrency:
+    """A CPU budget: ``workers`` concurrent runs of ``threads`` threads each."""
+
+    workers: int = 1
+    threads: int = 1
+
+    @classmethod
+    def for_cpus(cls, workers: int = 1, cpus: int | None = None) -> Concurrency:
+        """Split ``cpus`` (by default all usable ones) evenly between workers.
+
+        Parameters
+        ----------
+        workers : int
+            Number of runs to execute side by side, by default 1
+        cpus : int | None
+            CPU budget to divide, by default ``available_cpus()``
+
+        Returns
+        -------
+        Concurrency
+            A budget that never asks for more threads than ``cpus`` in total.
+        """
+        cpus = available_cpus() if cpus is None else cpus
+        workers = max(1, min(workers, cpus))
+        return cls(workers=workers, threads=max(1, cpus // workers))
+
+    def aer_options(self) -> dict[str, Any]:
+        """Aer options that keep one simulator inside ``threads`` threads.
+
+        Returns
+        -------
+        dict[str, Any]
+            Keyword arguments for ``AerSimulator``. Aer splits
+            ``max_parallel_threads`` between experiments and shots itself, so
+            the two inner limits only cap how it may divide the total.
+        """
+        return {
+            "max_parallel_threads": self.threads,
+            "max_parallel_experiments": self.threads,
+            "max_parallel_shots": self.threads,
+        }
+
+    def blas_env(self) -> dict[str, str]:
+        """Map each BLAS/OpenMP thread variable to ``threads``."""
+        return dict.fromkeys(BLAS_ENV_VARS, str(self.threads))
+
+    def executor(self) -> ProcessPoolExecutor:
+        """Start a pool of ``workers`` processes, each held to ``threads``.
+
+        Returns
+        -------
+        ProcessPoolExecutor
+            A pool whose processes are spawned rather than forked, so they do
+            not inherit this process's thread pools, and which install this
+            budget before running any task. This process's own environment and
+            limits are left as they are.
+        """
+        return ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=configure,
+            initargs=(self,),
+        )
+
+
+_current = Concurrency(threads=available_cpus())
+
+
+def current() -> Concurrency:
+    """Return the budget installed by ``configure`` (one worker, all CPUs)."""
+    return _current
+
+
+def configure(concurrency: Concurrency) -> None:
+    """Install ``concurrency`` as this process's budget.
+
+    BLAS and OpenMP libraries already loaded, NumPy's included, are limited
+    through ``threadpoolctl``. The BLAS variables are exported as well, for
+    libraries loaded later and for processes started from here on.
+    """
+    global _current
+    _current = concurrency
+    os.environ.update(concurrency.blas_env())
+    threadpool_limits(concurrency.threads)
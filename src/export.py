@@ -0,0 +1,348 @@
+"""Binary export of a run's outputs as raw, memory-mappable arrays.
+
+The pydantic models serialize the statevector as the string ``"Statevector"``
+and every distribution as a JSON dict keyed by bitstrings, which loses the
+amplitudes and makes large distributions slow to write and parse. A result
+file instead stores them as typed little-endian arrays:
+
+    8 bytes     magic: byte 0x93, then ``QRESULT``
+    4 bytes     header length, little-endian uint32
+    header      UTF-8 JSON, space-padded so the first array starts aligned
+    arrays      each starting on a 64-byte boundary
+
+The header holds the format version, every array's dtype, shape and offset,
+and the models' remaining scalar fields, so a file round-trips to the models.
+Dicts keep their order: a dict becomes a ``<name>.states`` array of basis
+indices, in the dict's order, and a ``<name>.values`` array. Multi-register
+keys such as ``"001 000"`` are rebuilt from the register widths in the header.
+
+``ResultFile`` maps the file once and exposes each array as a read-only view
+into it, so opening a file reads only the header.
+
+    save_results(Path("run.qres"), report=report, result=result, readout=readout)
+    amplitudes = ResultFile(Path("run.qres"))["statevector"]
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import struct
+import tempfile
+from typing import TYPE_CHECKING, Any
+
+import numpy as np
+from qiskit.quantum_info import Statevector
+
+from models.nn import NeuralReadout
+from models.quantum import QuantumCircuitReport, QuantumSimulationResult
+
+if TYPE_CHECKING:
+    from collections.abc import Mapping
+    from pathlib import Path
+
+MAGIC = b"\x93QRESULT"
+FORMAT_VERSION = 1
+ALIGNMENT = 64  # array offsets are multiples of this, for aligned SIMD loads
+
+_LENGTH = struct.Struct("<I")
+_PREAMBLE = len(MAGIC) + _LENGTH.size
+
+
+def _aligned(offset: int) -> int:
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+def _encode_keys(keys: list[str]) -> tuple[np.ndarray, list[int]]:
+    """Turn bitstring keys into uint64 basis indices and register widths."""
+    # Keys of one dict share a layout, e.g. '001 000': read them all as one
+    # (N, length) character matrix rather than parsing each string.
+    length = len(keys[0]) if keys else 0
+    chars = np.frombuffer("".join(keys).encode("ascii"), dtype=np.uint8)
+    if chars.size != len(keys) * length:
+        raise ValueError("bitstring keys of different lengths")
+    chars = chars.reshape(len(keys), length)
+    spaces = chars[0] == ord(" ") if keys else np.zeros(0, dtype=bool)
+    bits = chars[:, ~spaces] - ord("0")
+    if (chars[:, spaces] != ord(" ")).any() or (bits > 1).any():
+        raise ValueError("bitstring keys of different shapes")
+    if bits.shape[1] > 64:
+        raise ValueError(f"{bits.shape[1]}-bit keys do not fit a uint64 basis index")
+    shifts = np.arange(bits.shape[1] - 1, -1, -1, dtype=np.uint64)
+    states = (bits.astype(np.uint64) << shifts).sum(axis=1, dtype=np.uint64)
+    widths = [len(group) for group in keys[0].split(" ")] if keys else []
+    return states, widths
+
+
+def _decode_keys(states: np.ndarray, widths: list[int]) -> list[str]:
+    """Rebuild bitstring keys from basis indices and register widths."""
+    if not len(states):
+        return []
+    shifts = np.arange(sum(widths) - 1, -1, -1, dtype=np.uint64)
+    digits = ((states[:, None] >> shifts) & np.uint64(1)).astype(np.uint8)
+    digits += ord("0")
+    # Put the spaces back between registers.
+    for cut in np.cumsum(widths[:-1])[::-1]:
+        digits = np.insert(digits, cut, ord(" "), axis=1)
+    length = digits.shape[1]
+    return digits.view(f"S{length}").ravel().astype(f"U{length}").tolist()
+
+
+class _Writer:
+    """Collects arrays and header fields, then lays them out in one file."""
+
+    def __init__(self):
+        """Start an empty file."""
+        self.arrays: dict[str, np.ndarray] = {}
+        self.header: dict[str, Any] = {"version": FORMAT_VERSION, "key_widths": {}}
+
+    def add(self, name: str, values: Any, dtype: np.dtype | type) -> None:
+        array = np.asarray(values, dtype=np.dtype(dtype).newbyteorder("<"))
+        self.arrays[name] = np.ascontiguousarray(array)
+
+    def add_dict(self, name: str, mapping: Mapping[str, float], dtype: type) -> None:
+        states, widths = _encode_keys(list(mapping))
+        self.header["key_widths"][name] = widths
+        self.add(f"{name}.states", states, np.uint64)
+        self.add(f"{name}.values", np.fromiter(mapping.values(), dtype), dtype)
+
+    def write(self, path: Path) -> int:
+        """Write the file atomically and return its size in bytes."""
+        # Offsets depend on the header's length and the header lists the
+        # offsets, so grow the header's slot until the offsets fit in it.
+        relative, end = {}, 0
+        for name, array in self.arrays.items():
+            relative[name] = _aligned(end)
+            end = relative[name] + array.nbytes
+        table = {
+            name: {"dtype": array.dtype.str, "shape": list(array.shape)}
+            for name, array in self.arrays.items()
+        }
+        self.header["arrays"] = table
+        base = 0
+        while True:
+            for name, entry in table.items():
+                entry["offset"] = base + relative[name]
+            text = json.dumps(self.header, separators=(",", ":")).encode()
+            if _PREAMBLE + len(text) <= base:
+                break
+            base = _aligned(_PREAMBLE + len(text))
+        text += b" " * (base - _PREAMBLE - len(text))
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.")
+        with os.fdopen(fd, "wb") as f:
+            f.write(MAGIC + _LENGTH.pack(len(text)) + text)
+            for name, array in self.arrays.items():
+                f.write(b"\0" * (table[name]["offset"] - f.tell()))
+                f.write(array.data)
+            size = f.tell()
+        os.replace(tmp, path)
+        return size
+
+
+def _add_report(writer: _Writer, report: QuantumCircuitReport) -> None:
+    properties = report.quantum_properties
+    state = properties.quantum_state_vector
+    if isinstance(state, str):
+        # Reports read back from JSON, e.g. from the result cache, hold only
+        # the placeholder; a file without the amplitudes would pass for one.
+        raise ValueError(
+            "the report holds no statevector, only the JSON placeholder"
+            f" {state!r}; recompute it before exporting"
+        )
+    writer.add("statevector", getattr(state, "data", state), np.complex128)
+    writer.add_dict("distribution", properties.probability_distribution, np.float64)
+    writer.add_dict(
+        "analysis",
+        {entry.state: entry.probability for entry in report.state_analysis},
+        np.float64,
+    )
+    writer.header["report"] = report.model_dump(
+        mode="json",
+        exclude={
+            "quantum_properties": {"quantum_state_vector", "probability_distribution"},
+            "state_analysis": True,
+        },
+    )
+
+
+def _add_result(writer: _Writer, result: QuantumSimulationResult) -> None:
+    writer.add_dict("counts", result.counts, np.int64)
+    writer.add_dict("probabilities", result.probabilities, np.float64)
+    writer.add("probabilities_vector", result.probabilities_vector, np.float64)
+    writer.header["result"] = result.model_dump(
+        mode="json", exclude={"counts", "probabilities", "probabilities_vector"}
+    )
+
+
+def _add_readout(writer: _Writer, readout: NeuralReadout) -> None:
+    writer.add("readout.activations", readout.activations, np.float64)
+    writer.add("readout.bits", readout.bits, np.uint8)
+    writer.header["readout"] = readout.model_dump(
+        mode="json", exclude={"activations", "bits"}
+    )
+
+
+def save_results(
+    path: Path,
+    report: QuantumCircuitReport | None = None,
+    result: QuantumSimulationResult | None = None,
+    readout: NeuralReadout | None = None,
+    activations: np.ndarray | None = None,
+) -> int:
+    """Write a run's outputs to a binary result file.
+
+    Parameters
+    ----------
+    path : Path
+        Where to write; replaced atomically if it exists
+    report : QuantumCircuitReport | None
+        The circuit report, holding its statevector; the amplitudes are
+        stored as complex128
+    result : QuantumSimulationResult | None
+        The measured counts and probabilities
+    readout : NeuralReadout | None
+        One network's readout
+    activations : np.ndarray | None
+        Any further activations, e.g. an ensemble's (k, outputs) array, stored
+        as ``activations`` in their own float dtype
+
+    Returns
+    -------
+    int
+        Size of the file in bytes.
+
+    Raises
+    ------
+    ValueError
+        If ``report`` holds the ``"Statevector"`` placeholder instead of
+        amplitudes, if a distribution's bitstring keys differ in shape or
+        exceed 64 bits, or if there is nothing to export.
+    """
+    writer = _Writer()
+    if report is not None:
+        _add_report(writer, report)
+    if result is not None:
+        _add_result(writer, result)
+    if readout is not None:
+        _add_readout(writer, readout)
+    if activations is not None:
+        array = np.asarray(activations)
+        dtype = array.dtype if array.dtype.kind == "f" else np.float64
+        writer.add("activations", array, dtype)
+    if not writer.arrays:
+        raise ValueError("nothing to export")
+    return writer.write(path)
+
+
+class ResultFile:
+    """A result file mapped into memory; arrays are views, not copies."""
+
+    def __init__(self, path: Path):
+        """Map ``path`` and parse its header.
+
+        Parameters
+        ----------
+        path : Path
+            A file written by ``save_results``
+
+        Raises
+        ------
+        ValueError
+            If the file is not a result file, is of a newer format version,
+            or is shorter than its header says.
+        """
+        self.path = path
+        self._data = np.memmap(path, dtype=np.uint8, mode="r")
+        if bytes(self._data[: len(MAGIC)]) != MAGIC:
+            raise ValueError(f"{path} is not a result file")
+        (length,) = _LENGTH.unpack(bytes(self._data[len(MAGIC) : _PREAMBLE]))
+        self.header: dict[str, Any] = json.loads(
+            bytes(self._data[_PREAMBLE : _PREAMBLE + length])
+        )
+        if self.header["version"] > FORMAT_VERSION:
+            raise ValueError(
+                f"{path} is format version {self.header['version']};"
+                f" this code reads up to {FORMAT_VERSION}"
+            )
+
+        self.arrays: dict[str, np.ndarray] = {}
+        for name, entry in self.header["arrays"].items():
+            dtype = np.dtype(entry["dtype"])
+            shape = tuple(entry["shape"])
+            start = entry["offset"]
+            stop = start + dtype.itemsize * int(np.prod(shape, dtype=np.int64))
+            if stop > len(self._data):
+                raise ValueError(f"{path} is truncated inside array {name!r}")
+            self.arrays[name] = self._data[start:stop].view(dtype).reshape(shape)
+
+    def __contains__(self, name: str) -> bool:
+        """Tell whether the file holds array ``name``."""
+        return name in self.arrays
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        """Return array ``name``, a read-only view into the mapped file."""
+        return self.arrays[name]
+
+    def _dict(self, name: str) -> dict[str, Any]:
+        keys = _decode_keys(self[f"{name}.states"], self.header["key_widths"][name])
+        return dict(zip(keys, self[f"{name}.values"].tolist(), strict=True))
+
+    def report(self) -> QuantumCircuitReport:
+        """Rebuild the circuit report.
+
+        Returns
+        -------
+        QuantumCircuitReport
+            The report as saved. Its statevector wraps the mapped amplitudes,
+            or is the string ``"Statevector"`` if none were stored.
+        """
+        data = self.header["report"]
+        amplitudes = (
+            Statevector(self["statevector"]) if "statevector" in self else "Statevector"
+        )
+        properties = data["quantum_properties"] | {
+            "quantum_state_vector": amplitudes,
+            "probability_distribution": self._dict("distribution"),
+        }
+        analysis = [
+            {"state": state, "probability": probability}
+            for state, probability in self._dict("analysis").items()
+        ]
+        return QuantumCircuitReport.model_validate(
+            data | {"quantum_properties": properties, "state_analysis": analysis}
+        )
+
+    def result(self) -> QuantumSimulationResult:
+        """Rebuild the simulation result.
+
+        Returns
+        -------
+        QuantumSimulationResult
+            The result as saved.
+        """
+        return QuantumSimulationResult.model_validate(
+            self.header["result"]
+            | {
+                "counts": self._dict("counts"),
+                "probabilities": self._dict("probabilities"),
+                "probabilities_vector": self["probabilities_vector"].tolist(),
+            }
+        )
+
+    def readout(self) -> NeuralReadout:
+        """Rebuild the network readout.
+
+        Returns
+        -------
+        NeuralReadout
+            The readout as saved.
+        """
+        return NeuralReadout.model_validate(
+            self.header["readout"]
+            | {
+                "activations": self["readout.activations"].tolist(),
+                "bits": self["readout.bits"].tolist(),
+            }
+        )
@@ -0,0 +1,193 @@
+"""Exact gradients of state and action probabilities w.r.t. circuit angles.
+
+For a gate ``exp(-i θ/2 P)`` with ``P`` a Pauli string (rx, ry, rz, rxx, ...),
+every measured probability is a sinusoid in ``θ`` and the parameter-shift rule
+
+    ∂p/∂θ = (p(θ + π/2) - p(θ - π/2)) / 2
+
+is exact. ``parameter_shift`` builds the base binding and both shifts of every
+parameter, 2P + 1 variants in all, and evaluates them in one Aer submission
+with exact probabilities, so the result carries neither finite-difference
+error nor shot noise.
+
+The state gradients are then pushed through the network by forward-mode
+differentiation: one batched matmul per layer carries all P directions for all
+networks at once. Action probabilities treat each output activation ``a_j`` as
+the chance that bit ``j`` is set; the actual readout thresholds instead, which
+is piecewise constant and has no useful gradient. Inputs are built by
+``nn.network_inputs``, as the pipeline builds them, without the entropy-weighted
+noise, whose mean is zero.
+"""
+
+from __future__ import annotations
+
+from collections import Counter
+from typing import TYPE_CHECKING, NamedTuple
+
+import numpy as np
+from qiskit.circuit import Parameter
+
+from constants import STATE_LIST
+from nn import action_table, network_inputs
+from profiling import stage
+from quantum_circuit_qiskit import exact_probabilities
+
+if TYPE_CHECKING:
+    from collections.abc import Mapping
+
+    from qiskit import QuantumCircuit
+
+# Gates generated by half a Pauli string, for which the two-term shift is exact
+SHIFTABLE_GATES = frozenset({"rx", "ry", "rz", "rxx", "ryy", "rzz", "rzx"})
+
+
+class Gradients(NamedTuple):
+    """Probabilities at the bound point and their derivatives.
+
+    ``P`` is the number of circuit parameters, ``K`` of basis states, ``k`` of
+    networks and ``A`` of actions.
+    """
+
+    parameters: tuple[Parameter, ...]  # the order of every P axis
+    state_probabilities: np.ndarray  # (K,)
+    state_gradients: np.ndarray  # (P, K)
+    activations: np.ndarray  # (k, outputs)
+    action_probabilities: np.ndarray  # (k, A)
+    action_gradients: np.ndarray  # (k, P, A)
+
+
+def _check_shiftable(circuit: QuantumCircuit) -> None:
+    uses: Counter[Parameter] = Counter()
+    for instruction in circuit.data:
+        operation = instruction.operation
+        for value in operation.params:
+            if not hasattr(value, "parameters"):
+                continue  # a number
+            if operation.name not in SHIFTABLE_GATES or not isinstance(
+                value, Parameter
+            ):
+                raise ValueError(
+                    f"{operation.name}({value}) is not a bare Pauli-rotation angle;"
+                    " the two-term shift rule does not apply"
+                )
+            uses[value] += 1
+    repeated = [str(p) for p, n in uses.items() if n > 1]
+    if repeated:
+        raise ValueError(f"parameters used by several gates: {repeated}")
+
+
+def _forward_with_tangents(
+    networks: np.ndarray, inputs: np.ndarray, tangents: np.ndarray
+) -> tuple[np.ndarray, np.ndarray]:
+    """Run ``ensemble_forward`` (noise-free) and its directional derivatives."""
+    # (k, outputs) activations and their (k, P, outputs) derivatives along each
+    # of the (P, K) input tangents
+    x = np.broadcast_to(inputs * 8.0, (len(networks), 1, inputs.shape[-1]))
+    dx = np.broadcast_to(tangents * 8.0, (len(networks), *tangents.shape))
+
+    z1 = x @ networks["weights_input_hidden1"] + networks["bias_hidden1"][:, None]
+    h1 = np.tanh(z1)
+    dh1 = (dx @ networks["weights_input_hidden1"]) * (1 - h1**2)
+
+    z2 = h1 @ networks["weights_hidden1_hidden2"] + networks["bias_hidden2"][:, None]
+    h2 = np.maximum(0, z2)
+    dh2 = (dh1 @ networks["weights_hidden1_hidden2"]) * (z2 > 0)
+
+    z3 = h2 @ networks["weights_hidden2_output"] + networks["bias_output"][:, None]
+    a = 0.5 * (1 + np.tanh(0.5 * z3))
+    da = (dh2 @ networks["weights_hidden2_output"]) * (a * (1 - a))
+    return a[:, 0, :], da
+
+
+def _action_matrix(outputs: int) -> np.ndarray:
+    """One-hot (2**outputs, A) map from bit patterns to the actions they pick."""
+    matrix = np.zeros((2**outputs, len(STATE_LIST)))
+    matrix[np.arange(2**outputs), action_table(outputs)] = 1.0
+    return matrix
+
+
+def _pattern_probabilities(
+    a: np.ndarray, da: np.ndarray
+) -> tuple[np.ndarray, np.ndarray]:
+    """Probabilities of every bit pattern, bit 0 most significant, and tangents."""
+    # (k, 2**m) probabilities and their (k, P, 2**m) derivatives
+    m = a.shape[-1]
+    bits = (np.arange(2**m)[:, None] >> np.arange(m)[::-1]) & 1  # (2**m, m)
+    on = bits.astype(bool)
+    q = np.where(on, a[:, None, :], 1 - a[:, None, :])  # (k, 2**m, m)
+    dq = np.where(on, da[:, :, None, :], -da[:, :, None, :])  # (k, P, 2**m, m)
+
+    # Product rule: bit j's derivative times the other bits' probabilities
+    dp = np.zeros(dq.shape[:-1])
+    for j in range(m):
+        others = np.prod(np.delete(q, j, axis=-1), axis=-1)  # (k, 2**m)
+        dp += dq[..., j] * others[:, None, :]
+    return q.prod(axis=-1), dp
+
+
+@stage
+def parameter_shift(
+    circuit: QuantumCircuit,
+    values: Mapping[Parameter, float],
+    networks: np.ndarray,
+) -> Gradients:
+    """Differentiate state and action probabilities w.r.t. every parameter.
+
+    Parameters
+    ----------
+    circuit : QuantumCircuit
+        A circuit whose parameters each set one Pauli-rotation angle, e.g.
+        ``create_circuit(3, 3, Parameter("phi"))``
+    values : Mapping[Parameter, float]
+        The point to differentiate at, one value per circuit parameter
+    networks : np.ndarray
+        (k,) ``parameter_dtype`` records, e.g. a ``WeightBank`` slice. The
+        state probabilities are cut or padded to their input size, as in
+        ``infer_current_action``.
+
+    Returns
+    -------
+    Gradients
+        Probabilities at ``values`` and their gradients along
+        ``circuit.parameters``, all from a single simulator submission.
+
+    Raises
+    ------
+    ValueError
+        If a parameter is missing from ``values``, appears in more than one
+        gate, or sets something other than a bare Pauli-rotation angle.
+    """
+    _check_shiftable(circuit)
+    parameters = tuple(circuit.parameters)
+    missing = [str(p) for p in parameters if p not in values]
+    if missing:
+        raise ValueError(f"no values for parameters {missing}")
+
+    base = {p: float(values[p]) for p in parameters}
+    bindings = [base]
+    for shift in (np.pi / 2, -np.pi / 2):
+        bindings += [{**base, p: base[p] + shift} for p in parameters]
+    probabilities = exact_probabilities(circuit, bindings)
+
+    count = len(parameters)
+    plus, minus = probabilities[1 : 1 + count], probabilities[1 + count :]
+    state_gradients = (plus - minus) / 2
+
+    # Fitting the inputs to the network is linear, so it maps tangents too.
+    input_size = networks.dtype["weights_input_hidden1"].shape[0]
+    a, da = _forward_with_tangents(
+        networks,
+        network_inputs(probabilities[0], input_size=input_size),
+        network_inputs(state_gradients, input_size=input_size),
+    )
+    patterns, pattern_gradients = _pattern_probabilities(a, da)
+    decode = _action_matrix(a.shape[-1])
+
+    return Gradients(
+        parameters=parameters,
+        state_probabilities=probabilities[0],
+        state_gradients=state_gradients,
+        activations=a,
+        action_probabilities=patterns @ decode,
+        action_gradients=pattern_gradients @ decode,
+    )
@@ -1,30 +1,152 @@
+import argparse
+import dataclasses
+from contextlib import nullcontext
 from datetime import UTC, datetime
+from pathlib import Path
 
+import numpy as np
+from jinja2 import Template
+from qiskit import qasm2
+
+from cache import ResultCache, cache_key, seed_key
+from concurrency import Concurrency, available_cpus, configure
+from constants import STATE_LIST
+from export import save_results
+from minify import DEFAULT_PRECISION
+from models.nn import NeuralReadout
+from models.quantum import QuantumCircuitReport, QuantumSimulationResult
 from nn import infer_current_action
-from quantum_circuit_qiskit import run_full_analysis
-from visualization import BannerData, create_banner
+from noise import NoiseConfig
+from pipeline import Task, run_graph
+from profiling import STAGES, Profiler
+from quantum_circuit_qiskit import (
+    create_circuit,
+    get_quantum_state_before_measurement,
+    run_full_analysis,
+)
+from seeding import run_seeds
+from visualization import (
+    ROOT,
+    BannerData,
+    create_banner,
+    load_fonts,
+    load_template,
+)
 
 _NUM_QUBITS = 3
 _NUM_CLASSICAL = 3
 _SHOTS = 8192
+_CACHE_DIR = ROOT / ".cache" / "results"
+
+
+def _measure(
+    cache: ResultCache | None,
+    num_qubits: int,
+    num_classical: int,
+    seq: np.random.SeedSequence,
+    noise: NoiseConfig | None = None,
+) -> tuple[QuantumCircuitReport, QuantumSimulationResult]:
+    """Run the quantum stage, or reuse its output for the same inputs and seed."""
+    if cache is None:
+        return run_full_analysis(
+            num_qubits,
+            num_classical,
+            np.random.default_rng(seq),
+            shots=_SHOTS,
+            noise=noise,
+        )
+
+    circuit = qasm2.dumps(create_circuit(num_qubits, num_classical))
+    device = None if noise is None else dataclasses.asdict(noise)
+    key = cache_key("measure", circuit, _SHOTS, device, seed_key(seq))
+    report = cache.get("report", key, QuantumCircuitReport)
+    result = cache.get("simulation", key, QuantumSimulationResult)
+    if report is not None and result is not None:
+        print("♻️ Reusing cached simulation")
+        return report, result
+
+    report, result = run_full_analysis(
+        num_qubits, num_classical, np.random.default_rng(seq), shots=_SHOTS, noise=noise
+    )
+    cache.put("report", key, report)
+    cache.put("simulation", key, result)
+    return report, result
+
+
+def _infer(
+    cache: ResultCache | None,
+    result: QuantumSimulationResult,
+    seq: np.random.SeedSequence,
+) -> NeuralReadout:
+    """Run inference, or reuse its output for the same measurement and seed."""
+    if cache is None:
+        return infer_current_action(result, np.random.default_rng(seq))
 
+    key = cache_key("infer", result.model_dump(mode="json"), seed_key(seq))
+    readout = cache.get("readout", key, NeuralReadout)
+    if readout is not None:
+        print("♻️ Reusing cached inference")
+        return readout
 
-def main():
+    readout = infer_current_action(result, np.random.default_rng(seq))
+    cache.put("readout", key, readout)
+    return readout
+
+
+def _with_amplitudes(
+    report: QuantumCircuitReport, num_qubits: int, num_classical: int
+) -> QuantumCircuitReport:
+    """Restore the statevector of a report read back from the cache."""
+    # The cache stores reports as JSON, where the statevector is only the
+    # string "Statevector". It is the ideal pre-measurement state of the
+    # circuit the cache key was built from, so recomputing it is exact.
+    properties = report.quantum_properties
+    if not isinstance(properties.quantum_state_vector, str):
+        return report
+    state = get_quantum_state_before_measurement(
+        create_circuit(num_qubits, num_classical)
+    )
+    properties = properties.model_copy(update={"quantum_state_vector": state})
+    return report.model_copy(update={"quantum_properties": properties})
+
+
+def main(
+    seed: int | None = None,
+    cache_dir: Path | None = _CACHE_DIR,
+    noise: NoiseConfig | None = None,
+    precision: int | None = DEFAULT_PRECISION,
+    compress: bool = False,
+    export: Path | None = None,
+):
     num_qubits = _NUM_QUBITS
     num_classical = _NUM_CLASSICAL
-    report, result = run_full_analysis(num_qubits, num_classical)
+    # Without an explicit seed every run draws fresh entropy, so its entries
+    # could never be hit again; only seeded runs use the cache.
+    cache = (
+        ResultCache(cache_dir) if cache_dir is not None and seed is not None else None
+    )
 
-    readout = infer_current_action(result)
+    # One root seed per run; passing its entropy back in replays the run.
+    root = np.random.SeedSequence(seed)
+    seeds = run_seeds(root)
+    print(f"🌱 Seed: {root.entropy}")
 
-    # Most probable state first, so the histogram reads as a ranking.
-    distribution = sorted(result.probabilities.items(), key=lambda kv: -kv[1])
+    def render(
+        measured: tuple[QuantumCircuitReport, QuantumSimulationResult],
+        readout: NeuralReadout,
+        fonts: str,
+        template: Template,
+    ) -> list[Path]:
+        report, result = measured
+        # Most probable state first, so the histogram reads as a ranking.
+        distribution = sorted(result.probabilities.items(), key=lambda kv: -kv[1])
 
-    # Example: 27 JUL 2026 · 17:46 UTC
-    timestamp = datetime.now(UTC).strftime("%d %b %Y · %H:%M UTC").upper()
+        # Example: 27 JUL 2026 · 17:46 UTC
+        timestamp = datetime.now(UTC).strftime("%d %b %Y · %H:%M UTC").upper()
 
-    written = create_banner(
-        BannerData(
+        data = BannerData(
             timestamp=timestamp,
+            circuit=create_circuit(num_qubits, num_classical),
             qubits=num_qubits,
             depth=report.circuit_info.depth,
             gate_count=sum(
@@ -39,15 +161,132 @@ def main():
             threshold=readout.threshold,
             bits=readout.bits,
             index=readout.index,
-            action_count=2 ** len(readout.bits),
+            action_count=len(STATE_LIST),
             action=readout.action,
         )
+        return create_banner(data, template, fonts, precision, compress)
+
+    # Fonts and the template load while the circuit is measured and read out.
+    outputs = run_graph(
+        {
+            "measure": Task(
+                lambda: _measure(cache, num_qubits, num_classical, seeds.quantum, noise)
+            ),
+            "readout": Task(
+                lambda measured: _infer(cache, measured[1], seeds.network),
+                deps=("measure",),
+            ),
+            "fonts": Task(load_fonts),
+            "template": Task(load_template),
+            "render": Task(render, deps=("measure", "readout", "fonts", "template")),
+        }
     )
+    written: list[Path] = outputs["render"]
+    readout: NeuralReadout = outputs["readout"]
+    if export is not None:
+        report, result = outputs["measure"]
+        report = _with_amplitudes(report, num_qubits, num_classical)
+        size = save_results(export, report=report, result=result, readout=readout)
+        print(f"💾 Exported {size} bytes to {export}")
 
     for path in written:
         print(f"🎨 Wrote {path}")
     print(f"🔥 Current Action: {readout.action}")
 
 
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Measure, infer and render.")
+    parser.add_argument(
+        "--seed",
+        type=int,
+        default=None,
+        help="root seed for the run; omit for fresh OS entropy",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        type=Path,
+        default=_CACHE_DIR,
+        help="where stage outputs of seeded runs are cached between runs",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="always recompute; neither read nor write the cache",
+    )
+    parser.add_argument(
+        "--noise",
+        action="store_true",
+        help="simulate device noise (depolarizing, relaxation, readout error)",
+    )
+    parser.add_argument(
+        "--precision",
+        type=int,
+        default=DEFAULT_PRECISION,
+        help="decimal places kept in banner coordinates when minifying",
+    )
+    parser.add_argument(
+        "--no-minify",
+        action="store_true",
+        help="write the banners exactly as the template renders them",
+    )
+    parser.add_argument(
+        "--compress",
+        action="store_true",
+        help="also write .svg.gz (and .svg.br, with brotli installed) banners",
+    )
+    parser.add_argument(
+        "--export",
+        type=Path,
+        metavar="PATH",
+        help="also save the run's statevector, counts and readout as binary arrays",
+    )
+    parser.add_argument(
+        "--threads",
+        type=int,
+        default=None,
+        help="CPU threads for simulation and BLAS; "
+        f"default is every usable CPU ({available_cpus()} here)",
+    )
+    parser.add_argument(
+        "--profile",
+        type=Path,
+        metavar="PATH",
+        help="write a pstats dump to PATH and sampled stacks to PATH.collapsed",
+    )
+    parser.add_argument(
+        "--profile-interval",
+        type=float,
+        metavar="SECONDS",
+        help="time between stack samples when profiling",
+    )
+    parser.add_argument(
+        "--profile-stage",
+        action="append",
+        default=[],
+        choices=sorted(STAGES),
+        help="only profile inside this stage; repeat for several",
+    )
+    return parser.parse_args()
+
+
 if __name__ == "__main__":
-    main()
+    args = _parse_args()
+    configure(
+        Concurrency.for_cpus()
+        if args.threads is None
+        else Concurrency(threads=args.threads)
+    )
+    profiler = (
+        Profiler(args.profile, args.profile_interval, frozenset(args.profile_stage))
+        if args.profile
+        else nullcontext()
+    )
+    with profiler:
+        main(
+            seed=args.seed,
+            cache_dir=None if args.no_cache else args.cache_dir,
+            noise=NoiseConfig() if args.noise else None,
+            precision=None if args.no_minify else args.precision,
+            compress=args.compress,
+            export=args.export,
+        )
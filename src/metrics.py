@@ -0,0 +1,111 @@
+"""Distances between a circuit's theoretical and measured distributions.
+
+Every function here works on a whole batch of runs at once: distributions are
+(N, 2**qubits) arrays in basis order, one row per run, so sweep and history
+jobs can score millions of runs without a Python loop per state.
+"""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, NamedTuple
+
+import numpy as np
+from scipy.special import chdtrc
+
+from models.quantum import DistributionMetrics
+
+if TYPE_CHECKING:
+    from collections.abc import Mapping, Sequence
+
+
+class MetricArrays(NamedTuple):
+    """Per-run metrics for a batch; field ``f`` has shape (N,)."""
+
+    total_variation: np.ndarray
+    kl_divergence: np.ndarray
+    hellinger: np.ndarray
+    chi_square: np.ndarray
+    chi_square_p_value: np.ndarray
+    fidelity: np.ndarray
+
+    def row(self, i: int) -> DistributionMetrics:
+        """Return run ``i``'s metrics as the model stored on its result."""
+        return DistributionMetrics(
+            **{k: float(v[i]) for k, v in self._asdict().items()}
+        )
+
+
+def counts_matrix(counts: Sequence[Mapping[str, int]], num_qubits: int) -> np.ndarray:
+    """Arrange Aer count dicts as an (N, 2**num_qubits) array in basis order.
+
+    Parameters
+    ----------
+    counts : Sequence[Mapping[str, int]]
+        One ``get_counts()`` dict per run. Keys may carry extra registers
+        (``"101 000"``); the first group is the measured one.
+    num_qubits : int
+        Number of measured qubits
+
+    Returns
+    -------
+    np.ndarray
+        Shots per basis state, int64.
+    """
+    matrix = np.zeros((len(counts), 2**num_qubits), dtype=np.int64)
+    for i, run in enumerate(counts):
+        for bitstring, n in run.items():
+            matrix[i, int(bitstring.split()[0], 2)] += n
+    return matrix
+
+
+def distribution_metrics(theory: np.ndarray, counts: np.ndarray) -> MetricArrays:
+    """Compare measured counts with theoretical probabilities, run by run.
+
+    Parameters
+    ----------
+    theory : np.ndarray
+        (N, K) or (K,) Born probabilities; a single row is shared by all runs
+    counts : np.ndarray
+        (N, K) or (K,) shots per basis state
+
+    Returns
+    -------
+    MetricArrays
+        Total-variation distance; KL divergence of the measured distribution
+        from the theoretical one, in bits; Hellinger distance; Pearson
+        chi-square statistic and its goodness-of-fit p-value; and classical
+        (Bhattacharyya) fidelity. Measured shots in a state of zero
+        theoretical probability make KL and chi-square infinite and the
+        p-value 0.
+    """
+    counts = np.atleast_2d(counts).astype(np.float64)
+    theory = np.broadcast_to(np.atleast_2d(theory), counts.shape)
+    shots = counts.sum(axis=1)
+    measured = counts / shots[:, None]
+
+    total_variation = 0.5 * np.abs(measured - theory).sum(axis=1)
+
+    bhattacharyya = np.sqrt(measured * theory).sum(axis=1)
+    fidelity = bhattacharyya**2
+    hellinger = np.sqrt(np.clip(1 - bhattacharyya, 0, None))
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        log_ratio = np.log2(measured / theory)
+        kl_divergence = np.where(measured > 0, measured * log_ratio, 0).sum(axis=1)
+
+        expected = shots[:, None] * theory
+        chi_terms = np.where(expected > 0, (counts - expected) ** 2 / expected, 0)
+        impossible = ((expected == 0) & (counts > 0)).any(axis=1)
+        chi_square = np.where(impossible, np.inf, chi_terms.sum(axis=1))
+
+    degrees = np.maximum((theory > 0).sum(axis=1) - 1, 1)
+    chi_square_p_value = chdtrc(degrees, chi_square)
+
+    return MetricArrays(
+        total_variation=total_variation,
+        kl_divergence=kl_divergence,
+        hellinger=hellinger,
+        chi_square=chi_square,
+        chi_square_p_value=chi_square_p_value,
+        fidelity=fidelity,
+    )
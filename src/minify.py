@@ -0,0 +1,219 @@
+"""Shrink the rendered banner SVG before it is written.
+
+The template is laid out for people: indentation, comments, one attribute per
+line and the same ``fill``/``stroke`` combination spelled out on every element.
+Each banner is committed twice a day and fetched on every profile view, so
+``minify_svg`` strips what the renderer ignores:
+
+* comments, and whitespace between tags (inside ``<text>`` whitespace is
+  rendered, so there it is only collapsed to single spaces, as SVG would);
+* digits beyond a fixed precision in coordinates and path data;
+* repeated sets of presentation attributes, which move into a CSS class.
+
+Hoisting is safe despite the template's warning about CSS outranking
+presentation attributes: an element keeps exactly the properties it had
+specified, and parents' values still reach it only through inheritance.
+
+``write_compressed`` adds precompressed siblings for servers that can send them
+as is. Gzip output is byte-for-byte reproducible (no timestamp); brotli is used
+when the optional ``brotli`` package is installed.
+"""
+
+from __future__ import annotations
+
+import gzip
+import re
+from collections import Counter
+from itertools import count, product
+from string import ascii_lowercase
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+    from pathlib import Path
+
+DEFAULT_PRECISION = 2
+
+# Attributes holding lengths or coordinates, rounded to the precision
+_GEOMETRY = frozenset(
+    {"x", "y", "x1", "y1", "x2", "y2", "cx", "cy", "r", "rx", "ry", "dx", "dy"}
+    | {"width", "height", "d", "points"}
+)
+# Presentation attributes that may move into a class, with the unit CSS needs
+# where the attribute form may omit it
+_HOISTABLE = {
+    "fill": "",
+    "stroke": "",
+    "stroke-width": "px",
+    "stroke-linecap": "",
+    "stroke-linejoin": "",
+    "font-size": "px",
+    "font-weight": "",
+    "letter-spacing": "px",
+    "text-anchor": "",
+}
+
+_TOKEN = re.compile(r"<!\[CDATA\[.*?\]\]>|<!--.*?-->|<[^>]*>", re.DOTALL)
+_ATTRIBUTE = re.compile(r'([\w:-]+)="([^"]*)"')
+_NUMBER = re.compile(r"-?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?")
+_PLAIN_NUMBER = re.compile(r"-?\d+(?:\.\d+)?")
+
+
+def _round(value: str, precision: int) -> str:
+    def fix(match: re.Match[str]) -> str:
+        text = f"{float(match.group()):.{precision}f}"
+        if "." in text:
+            text = text.rstrip("0").rstrip(".")
+        return "0" if text == "-0" else text
+
+    return " ".join(_NUMBER.sub(fix, value).split())
+
+
+class _Element:
+    """A start or empty-element tag, split into name and attributes."""
+
+    __slots__ = ("attributes", "closed", "name")
+
+    def __init__(self, tag: str, precision: int):
+        """Parse ``tag``, e.g. ``<rect x="1" y="2"/>``, rounding its geometry."""
+        self.closed = tag.endswith("/>")
+        self.name = tag[1:].split(maxsplit=1)[0].rstrip("/>")
+        self.attributes = {
+            k: _round(v, precision) if k in _GEOMETRY else v
+            for k, v in _ATTRIBUTE.findall(tag)
+        }
+
+    def hoistable(self) -> tuple[tuple[str, str], ...]:
+        """Return the attributes that could become a class, in a stable order."""
+        return tuple(
+            (k, v) for k, v in sorted(self.attributes.items()) if k in _HOISTABLE
+        )
+
+    def render(self) -> str:
+        """Serialize the tag with single spaces between attributes."""
+        attributes = "".join(f' {k}="{v}"' for k, v in self.attributes.items())
+        return f"<{self.name}{attributes}{'/' if self.closed else ''}>"
+
+
+def _class_names() -> Iterator[str]:
+    for width in count(1):
+        for letters in product(ascii_lowercase, repeat=width):
+            yield "".join(letters)
+
+
+def _css_value(name: str, value: str) -> str:
+    unit = _HOISTABLE[name]
+    return value + unit if unit and _PLAIN_NUMBER.fullmatch(value) else value
+
+
+def _hoist(elements: list[_Element]) -> str:
+    """Replace repeated attribute sets with classes; return their CSS rules."""
+    usage = Counter(
+        e.hoistable() for e in elements if e.hoistable() and "class" not in e.attributes
+    )
+    names = _class_names()
+    name = next(names)
+    rules: list[str] = []
+    classes: dict[tuple[tuple[str, str], ...], str] = {}
+    for signature, uses in usage.most_common():
+        if uses < 2:
+            break
+        body = ";".join(f"{k}:{_css_value(k, v)}" for k, v in signature)
+        rule = f".{name}{{{body}}}"
+        inline = sum(len(f' {k}="{v}"') for k, v in signature)
+        if uses * inline > uses * len(f' class="{name}"') + len(rule):
+            classes[signature] = name
+            rules.append(rule)
+            name = next(names)
+
+    for element in elements:
+        name = classes.get(element.hoistable())
+        if name is None or "class" in element.attributes:
+            continue
+        for key, _ in element.hoistable():
+            del element.attributes[key]
+        element.attributes["class"] = name
+    return "".join(rules)
+
+
+def minify_svg(svg: str, precision: int = DEFAULT_PRECISION) -> str:
+    """Return ``svg`` without layout whitespace, excess digits or repetition.
+
+    Parameters
+    ----------
+    svg : str
+        An SVG document as rendered from the banner template
+    precision : int
+        Decimal places kept in coordinates and path data, by default 2
+
+    Returns
+    -------
+    str
+        A document that renders identically at that precision.
+    """
+    parts = _parse(svg, precision)
+    css = _hoist([p for p in parts if isinstance(p, _Element)])
+    out = "".join(p.render() if isinstance(p, _Element) else p for p in parts)
+    if not css:
+        return out
+    if "]]></style>" in out:
+        return out.replace("]]></style>", css + "]]></style>", 1)
+    head = out.index(">", out.index("<svg")) + 1
+    return f"{out[:head]}<style>{css}</style>{out[head:]}"
+
+
+def _parse(svg: str, precision: int) -> list[str | _Element]:
+    """Split ``svg`` into tags and text, dropping what does not render."""
+    parts: list[str | _Element] = []
+    text_depth = 0  # whitespace is rendered inside <text>
+    position = 0
+    for match in _TOKEN.finditer(svg):
+        _add_text(parts, svg[position : match.start()], inside_text=text_depth > 0)
+        position = match.end()
+        token = match.group()
+        if token.startswith("<!--"):
+            continue
+        if token.startswith("<![CDATA["):
+            parts.append(re.sub(r"\s*\n\s*", "", token))
+        elif token.startswith(("<?", "<!", "</")):
+            text_depth -= token == "</text>"
+            parts.append(token)
+        else:
+            element = _Element(token, precision)
+            text_depth += element.name == "text" and not element.closed
+            parts.append(element)
+    _add_text(parts, svg[position:], inside_text=False)
+    return parts
+
+
+def _add_text(parts: list[str | _Element], text: str, inside_text: bool) -> None:
+    if inside_text:
+        parts.append(re.sub(r"\s+", " ", text))
+    elif text.strip():
+        parts.append(" ".join(text.split()))
+
+
+def write_compressed(path: Path) -> list[Path]:
+    """Write precompressed siblings of ``path``: ``.gz`` and, if possible, ``.br``.
+
+    Parameters
+    ----------
+    path : Path
+        The file to compress
+
+    Returns
+    -------
+    list[Path]
+        The files written.
+    """
+    data = path.read_bytes()
+    written = [path.with_name(path.name + ".gz")]
+    written[0].write_bytes(gzip.compress(data, compresslevel=9, mtime=0))
+    try:
+        import brotli
+    except ImportError:
+        return written
+    br = path.with_name(path.name + ".br")
+    br.write_bytes(brotli.compress(data, quality=11))
+    written.append(br)
+    return written
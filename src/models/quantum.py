@@ -59,6 +59,19 @@ class QuantumCircuitReport(BaseModel):
     circuit_ascii: str
 
 
+class DistributionMetrics(BaseModel):
+    """How far the measured distribution landed from the statevector's."""
+
+    # Infinite KL / chi-square are meaningful here, so keep them in JSON.
+    model_config = ConfigDict(extra="forbid", frozen=True, ser_json_inf_nan="constants")
+    total_variation: float = Field(description="Total-variation distance")
+    kl_divergence: float = Field(description="KL(measured || theory) in bits")
+    hellinger: float = Field(description="Hellinger distance")
+    chi_square: float = Field(description="Pearson chi-square statistic")
+    chi_square_p_value: float = Field(description="Goodness-of-fit p-value")
+    fidelity: float = Field(description="Classical (Bhattacharyya) fidelity")
+
+
 class QuantumSimulationResult(BaseModel):
     model_config = ConfigDict(extra="forbid", frozen=True)
     counts: dict[str, int]
@@ -67,3 +80,7 @@ class QuantumSimulationResult(BaseModel):
     entropy: float
     max_prob: float
     dominant_state: int
+    metrics: DistributionMetrics | None = Field(
+        default=None,
+        description="Comparison with the theoretical distribution, if computed",
+    )
@@ -0,0 +1,32 @@
+import math
+
+from pydantic import BaseModel, ConfigDict, Field
+
+from .nn import NeuralReadout
+from .quantum import QuantumCircuitReport, QuantumSimulationResult
+
+
+class SweepSpec(BaseModel):
+    """A grid of banner runs: every ``phi`` with every seed, in that order."""
+
+    model_config = ConfigDict(extra="forbid", frozen=True)
+    phis: list[float] = Field(
+        default=[math.pi / 3], description="Angles of the circuit's ry gate"
+    )
+    first_seed: int = Field(default=0, description="Root seed of the first run")
+    seed_count: int = Field(gt=0, description="Consecutive root seeds per angle")
+    shots: int = Field(default=8192, gt=0, description="Shots per simulation")
+    noise: bool = Field(default=False, description="Simulate default device noise")
+    shard_size: int = Field(default=16, gt=0, description="Runs per shard")
+
+
+class SweepRecord(BaseModel):
+    """One finished run of a sweep, replayable with ``main.py --seed``."""
+
+    model_config = ConfigDict(extra="forbid", frozen=True)
+    index: int = Field(description="Position of the run in the sweep")
+    phi: float = Field(description="Angle of the circuit's ry gate")
+    seed: int = Field(description="Root seed of the run")
+    report: QuantumCircuitReport
+    result: QuantumSimulationResult
+    readout: NeuralReadout
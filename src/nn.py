@@ -1,16 +1,210 @@
 from __future__ import annotations
 
-import time
+import functools
 from typing import TYPE_CHECKING
 
 import numpy as np
 
 from constants import STATE_LIST
 from models.nn import NeuralReadout
+from profiling import stage
 
 if TYPE_CHECKING:
+    from numpy.typing import DTypeLike
+
     from models.quantum import QuantumSimulationResult
 
+_INT8_MAX = 127
+
+# Standard deviations the weights and biases are drawn with
+WEIGHT_SCALE = 0.7
+BIAS_SCALE = 0.15
+
+# Noise on the scaled inputs per forward pass, and entropy-weighted noise on
+# the measured probabilities before inference
+NOISE_SCALE = 0.08
+QUANTUM_NOISE_SCALE = 0.1
+
+
+@functools.cache
+def action_table(bits: int, actions: int = len(STATE_LIST)) -> np.ndarray:
+    """Map every ``bits``-wide output pattern to an action index.
+
+    Pattern ``p`` (bit 0 most significant) picks action
+    ``p * actions // 2**bits``, which splits the patterns into ``actions``
+    contiguous runs whose lengths differ by at most one. Folding indices with
+    ``% actions`` instead sends the overflow patterns to the first actions.
+
+    Parameters
+    ----------
+    bits : int
+        Output neurons, each contributing one bit
+    actions : int
+        Number of actions, by default ``len(STATE_LIST)``
+
+    Returns
+    -------
+    np.ndarray
+        Read-only (2**bits,) int64 table of action indices.
+
+    Raises
+    ------
+    ValueError
+        If there are fewer patterns than actions, so some action could never
+        be picked.
+    """
+    patterns = 2**bits
+    if patterns < actions:
+        raise ValueError(
+            f"{bits} output bits give {patterns} patterns for {actions} actions"
+        )
+    table = np.arange(patterns, dtype=np.int64) * actions // patterns
+    table.flags.writeable = False
+    return table
+
+
+def decode_actions(bits: np.ndarray, actions: int = len(STATE_LIST)) -> np.ndarray:
+    """Decode output bits to action indices with one gather from ``action_table``.
+
+    Parameters
+    ----------
+    bits : np.ndarray
+        (..., m) array of 0/1 outputs, bit 0 most significant
+    actions : int
+        Number of actions, by default ``len(STATE_LIST)``
+
+    Returns
+    -------
+    np.ndarray
+        (...) int64 action indices.
+    """
+    bits = np.asarray(bits)
+    width = bits.shape[-1]
+    place_values = 1 << np.arange(width - 1, -1, -1, dtype=np.int64)
+    return action_table(width, actions)[bits.astype(np.int64) @ place_values]
+
+
+def network_inputs(
+    probabilities: np.ndarray,
+    quantum_noise: np.ndarray | None = None,
+    input_size: int = 8,
+) -> np.ndarray:
+    """Turn measured probabilities into the inputs the network reads.
+
+    ``infer_current_action``, ``stream`` and ``gradients`` all build their
+    inputs here, so a run decodes the same action whichever path computes it.
+
+    Parameters
+    ----------
+    probabilities : np.ndarray
+        (..., 2**qubits) measured probabilities in basis order
+    quantum_noise : np.ndarray | None
+        Standard normal draws of the same shape, added after scaling by each
+        row's entropy in bits and ``QUANTUM_NOISE_SCALE``. Noise-free when
+        omitted.
+    input_size : int
+        Network input width, by default 8; rows are cut or zero-padded to it
+
+    Returns
+    -------
+    np.ndarray
+        (..., input_size) float64 inputs.
+    """
+    inputs = np.asarray(probabilities, dtype=np.float64)
+    if quantum_noise is not None:
+        logs = np.log2(inputs, where=inputs > 0, out=np.zeros_like(inputs))
+        entropy = -np.sum(inputs * logs, axis=-1, keepdims=True)
+        inputs = inputs + entropy * QUANTUM_NOISE_SCALE * quantum_noise
+    width = min(inputs.shape[-1], input_size)
+    fitted = np.zeros((*inputs.shape[:-1], input_size))
+    fitted[..., :width] = inputs[..., :width]
+    return fitted
+
+
+def parameter_dtype(
+    input_size: int = 8,
+    hidden1_size: int = 8,
+    hidden2_size: int = 7,
+    output_size: int = 4,
+    dtype: DTypeLike = np.float64,
+) -> np.dtype:
+    """Record layout of one network's parameters, fields in draw order.
+
+    Parameters
+    ----------
+    input_size : int
+        Number of input neurons, by default 8
+    hidden1_size : int
+        Number of first hidden layer neurons, by default 8
+    hidden2_size : int
+        Number of second hidden layer neurons, by default 7
+    output_size : int
+        Number of output neurons, by default 4
+    dtype : DTypeLike
+        Floating dtype the parameters are stored in, by default float64
+
+    Returns
+    -------
+    np.dtype
+        A packed structured dtype whose fields are named after the
+        ``SimpleNeuralNetwork`` attributes they initialize.
+    """
+    return np.dtype(
+        [
+            ("weights_input_hidden1", dtype, (input_size, hidden1_size)),
+            ("bias_hidden1", dtype, (hidden1_size,)),
+            ("weights_hidden1_hidden2", dtype, (hidden1_size, hidden2_size)),
+            ("bias_hidden2", dtype, (hidden2_size,)),
+            ("weights_hidden2_output", dtype, (hidden2_size, output_size)),
+            ("bias_output", dtype, (output_size,)),
+        ]
+    )
+
+
+def draw_parameters(rng: np.random.Generator, layout: np.dtype) -> np.ndarray:
+    """Draw one network's parameters from ``rng``.
+
+    Fields are drawn one after another in ``layout`` order, so a record drawn
+    here holds exactly the weights ``SimpleNeuralNetwork(rng=rng)`` would draw.
+
+    Parameters
+    ----------
+    rng : np.random.Generator
+        Source of the parameters
+    layout : np.dtype
+        Record layout from ``parameter_dtype``
+
+    Returns
+    -------
+    np.ndarray
+        A 0-d record array of ``layout``.
+    """
+    record = np.zeros((), dtype=layout)
+    for name in layout.names or ():
+        scale = BIAS_SCALE if name.startswith("bias") else WEIGHT_SCALE
+        record[name] = rng.standard_normal(layout[name].shape) * scale
+    return record
+
+
+def _quantize(weights: np.ndarray) -> tuple[np.ndarray, float]:
+    """Quantize a weight matrix to int8 with one symmetric per-layer scale.
+
+    Parameters
+    ----------
+    weights : np.ndarray
+        The full-precision weight matrix
+
+    Returns
+    -------
+    tuple[np.ndarray, float]
+        The int8 weights and the scale that maps them back, so that
+        ``q * scale`` approximates ``weights`` to within ``scale / 2``.
+    """
+    peak = float(np.max(np.abs(weights)))
+    scale = peak / _INT8_MAX if peak > 0 else 1.0
+    q = np.clip(np.rint(weights / scale), -_INT8_MAX, _INT8_MAX)
+    return q.astype(np.int8), scale
+
 
 class SimpleNeuralNetwork:
     """A simple neural network.
@@ -24,6 +218,10 @@ class SimpleNeuralNetwork:
         hidden1_size: int = 8,
         hidden2_size: int = 7,
         output_size: int = 4,
+        rng: np.random.Generator | None = None,
+        dtype: DTypeLike = np.float64,
+        quantize: bool = False,
+        parameters: np.ndarray | None = None,
     ):
         """Initialize the neural network with random weights.
 
@@ -37,34 +235,111 @@ class SimpleNeuralNetwork:
             Number of second hidden layer neurons, by default 7
         output_size : int
             Number of output neurons, by default 4
+        rng : np.random.Generator | None
+            Source of the weights and of the forward-pass noise. A fresh,
+            OS-seeded generator is used when omitted.
+        dtype : DTypeLike
+            Floating dtype of biases and activations, by default float64.
+            float32 halves the memory traffic of batch scoring.
+        quantize : bool
+            Store the weight matrices as int8 with one scale per layer,
+            by default False. Biases stay in ``dtype``.
+        parameters : np.ndarray | None
+            A ``parameter_dtype`` record to take the weights from instead of
+            drawing them, e.g. one entry of a ``WeightBank``. ``rng`` then only
+            drives the forward-pass noise.
+
+        Raises
+        ------
+        ValueError
+            If ``parameters`` does not match the layer sizes.
+
+        Notes
+        -----
+        Weights and noise are always drawn in float64 and then converted, so
+        networks built from the same generator state differ only by precision
+        and can be compared against the float64 reference directly.
         """
         self.input_size = input_size
         self.hidden1_size = hidden1_size
         self.hidden2_size = hidden2_size
         self.output_size = output_size
+        self.dtype = np.dtype(dtype)
+        self.quantized = quantize
 
-        # Use current time for more randomness
-        np.random.seed(int(time.time() * 1000) % 2**32)
+        # The network owns its stream; the global np.random state is never used
+        self.rng = rng if rng is not None else np.random.default_rng()
 
         # Initialize weights with more variation for 4-layer architecture
+        layout = parameter_dtype(input_size, hidden1_size, hidden2_size, output_size)
+        if parameters is None:
+            parameters = draw_parameters(self.rng, layout)
+        elif any(
+            parameters.dtype[name].shape != layout[name].shape
+            for name in layout.names or ()
+        ):
+            raise ValueError(
+                f"parameters {parameters.dtype} do not fit a "
+                f"{input_size}→{hidden1_size}→{hidden2_size}→{output_size} network"
+            )
+
         # Layer 1: Input → Hidden1 (8 → 8)
-        self.weights_input_hidden1 = np.random.randn(input_size, hidden1_size) * 0.7
-        self.bias_hidden1 = np.random.randn(hidden1_size) * 0.15
+        self.weights_input_hidden1 = np.array(
+            parameters["weights_input_hidden1"], dtype=np.float64
+        )
+        self.bias_hidden1 = np.array(parameters["bias_hidden1"], dtype=np.float64)
 
         # Layer 2: Hidden1 → Hidden2 (8 → 7)
-        self.weights_hidden1_hidden2 = np.random.randn(hidden1_size, hidden2_size) * 0.7
-        self.bias_hidden2 = np.random.randn(hidden2_size) * 0.15
+        self.weights_hidden1_hidden2 = np.array(
+            parameters["weights_hidden1_hidden2"], dtype=np.float64
+        )
+        self.bias_hidden2 = np.array(parameters["bias_hidden2"], dtype=np.float64)
 
         # Layer 3: Hidden2 → Output (7 → 4)
-        self.weights_hidden2_output = np.random.randn(hidden2_size, output_size) * 0.7
-        self.bias_output = np.random.randn(output_size) * 0.15
+        self.weights_hidden2_output = np.array(
+            parameters["weights_hidden2_output"], dtype=np.float64
+        )
+        self.bias_output = np.array(parameters["bias_output"], dtype=np.float64)
 
         # Add some dynamic noise weights that change with each prediction
-        self.noise_scale = 0.08
+        self.noise_scale = NOISE_SCALE
+
+        # Reduced precision: one scale per weight matrix, None when unquantized
+        self.scale_input_hidden1: float | None = None
+        self.scale_hidden1_hidden2: float | None = None
+        self.scale_hidden2_output: float | None = None
+        if quantize:
+            self.weights_input_hidden1, self.scale_input_hidden1 = _quantize(
+                self.weights_input_hidden1
+            )
+            self.weights_hidden1_hidden2, self.scale_hidden1_hidden2 = _quantize(
+                self.weights_hidden1_hidden2
+            )
+            self.weights_hidden2_output, self.scale_hidden2_output = _quantize(
+                self.weights_hidden2_output
+            )
+        else:
+            self.weights_input_hidden1 = self.weights_input_hidden1.astype(dtype)
+            self.weights_hidden1_hidden2 = self.weights_hidden1_hidden2.astype(dtype)
+            self.weights_hidden2_output = self.weights_hidden2_output.astype(dtype)
+        self.bias_hidden1 = self.bias_hidden1.astype(dtype)
+        self.bias_hidden2 = self.bias_hidden2.astype(dtype)
+        self.bias_output = self.bias_output.astype(dtype)
+
+    def _dense(
+        self, x: np.ndarray, weights: np.ndarray, scale: float | None, bias: np.ndarray
+    ) -> np.ndarray:
+        """Affine layer; int8 weights are rescaled after the product, not before."""
+        out = np.dot(x, weights)
+        if scale is not None:
+            out *= self.dtype.type(scale)
+        return out + bias
 
     def sigmoid(self, x: np.ndarray) -> np.ndarray:
         """Sigmoid activation function."""
-        return 1 / (1 + np.exp(-np.clip(x, -500, 500)))  # Clip to prevent overflow
+        # Written via tanh, which saturates instead of overflowing, so no clip
+        # is needed and float32 inputs stay float32.
+        return 0.5 * (1 + np.tanh(0.5 * x))
 
     def tanh_activation(self, x: np.ndarray) -> np.ndarray:
         """Tanh activation function for more dynamic range."""
@@ -80,125 +355,154 @@ class SimpleNeuralNetwork:
         Parameters
         ----------
         inputs : np.ndarray
-            Input vector of size 8
+            Input vector of size 8, or a (batch, 8) array of them
         add_noise : bool
             Whether to add dynamic noise for variation
 
         Returns
         -------
         np.ndarray
-            Output vector of size 4 with values between 0 and 1
+            Output of size 4 (per row) with values between 0 and 1, in the
+            network's dtype
         """
-        # Ensure input is the right shape
-        if inputs.shape[0] != self.input_size:
-            if len(inputs) > self.input_size:
-                inputs = inputs[: self.input_size]  # Truncate if too long
-            else:
-                # Pad with zeros if too short
-                padded = np.zeros(self.input_size)
-                padded[: len(inputs)] = inputs
-                inputs = padded
+        # Ensure input is the right shape: truncate if too long, pad if too short
+        if inputs.shape[-1] != self.input_size:
+            inputs = network_inputs(inputs, input_size=self.input_size)
 
         # Scale inputs to make network more sensitive to small differences
-        scaled_inputs = inputs * 8.0
+        scaled_inputs = np.asarray(inputs, dtype=self.dtype) * self.dtype.type(8.0)
 
-        # Add slight input-dependent noise for variation
+        # Add slight noise for variation, drawn from the network's own stream
         if add_noise:
-            input_hash = np.sum(inputs * np.arange(len(inputs))) % 1000
-            np.random.seed(int(input_hash))
-            noise = np.random.randn(*scaled_inputs.shape) * self.noise_scale
-            scaled_inputs += noise
+            noise = self.rng.standard_normal(scaled_inputs.shape) * self.noise_scale
+            scaled_inputs += noise.astype(self.dtype)
 
         # Layer 1: Input → Hidden1 (8 → 8)
-        hidden1_input = (
-            np.dot(scaled_inputs, self.weights_input_hidden1) + self.bias_hidden1
+        hidden1_input = self._dense(
+            scaled_inputs,
+            self.weights_input_hidden1,
+            self.scale_input_hidden1,
+            self.bias_hidden1,
         )
         hidden1_output = self.tanh_activation(hidden1_input)
 
         # Layer 2: Hidden1 → Hidden2 (8 → 7)
-        hidden2_input = (
-            np.dot(hidden1_output, self.weights_hidden1_hidden2) + self.bias_hidden2
+        hidden2_input = self._dense(
+            hidden1_output,
+            self.weights_hidden1_hidden2,
+            self.scale_hidden1_hidden2,
+            self.bias_hidden2,
         )
         hidden2_output = self.relu_activation(hidden2_input)
 
         # Layer 3: Hidden2 → Output (7 → 4)
-        output_input = (
-            np.dot(hidden2_output, self.weights_hidden2_output) + self.bias_output
+        output_input = self._dense(
+            hidden2_output,
+            self.weights_hidden2_output,
+            self.scale_hidden2_output,
+            self.bias_output,
         )
         output = self.sigmoid(output_input)
 
         return output
 
-    def predict_bits(self, inputs: np.ndarray) -> tuple[np.ndarray, float, np.ndarray]:
+    def predict_bits(
+        self, inputs: np.ndarray
+    ) -> tuple[np.ndarray, float | np.ndarray, np.ndarray]:
         """Predict binary outputs from inputs.
 
         Parameters
         ----------
         inputs : np.ndarray
-            Input vector
+            Input vector, or a (batch, 8) array of them
 
         Returns
         -------
-        tuple[np.ndarray, float, np.ndarray]
+        tuple[np.ndarray, float | np.ndarray, np.ndarray]
             The raw output activations, the adaptive threshold applied to them,
             and the resulting 4-bit binary output. The banner renders all three,
-            so the threshold has to come back out rather than stay local.
+            so the threshold has to come back out rather than stay local. For a
+            batch, each row is thresholded against its own mean, so the
+            thresholds are a (batch,) array and no row depends on another.
         """
         output = self.forward(inputs)
 
         # Use adaptive thresholding based on the output distribution
-        mean_output = float(np.mean(output))
-        adaptive_threshold = max(0.3, min(0.7, mean_output))
+        thresholds = np.clip(np.mean(output, axis=-1, keepdims=True), 0.3, 0.7)
+        bits = (output > thresholds).astype(int)
+        adaptive_threshold = (
+            float(thresholds[0]) if output.ndim == 1 else thresholds[:, 0]
+        )
 
         print(f"🎯 Network output values: {output}")
-        print(f"🎯 Adaptive threshold: {adaptive_threshold:.3f}")
+        if output.ndim == 1:
+            print(f"🎯 Adaptive threshold: {adaptive_threshold:.3f}")
+        else:
+            print(f"🎯 Adaptive thresholds: {np.round(adaptive_threshold, 3)}")
 
-        return output, adaptive_threshold, (output > adaptive_threshold).astype(int)
+        return output, adaptive_threshold, bits
 
     def bits_to_action_index(self, bits: np.ndarray) -> int:
-        """Convert 4-bit binary to action index.
+        """Convert the output bits to an action index.
 
         Parameters
         ----------
         bits : np.ndarray
-            4-bit binary array
+            Binary output array, one bit per output neuron
 
         Returns
         -------
         int
-            Index corresponding to the binary representation
+            Index into ``STATE_LIST``, looked up in ``action_table``
         """
-        return int(np.dot(bits, [8, 4, 2, 1]))  # Convert binary to decimal
+        return int(decode_actions(bits))
 
 
-def create_dynamic_neural_network() -> SimpleNeuralNetwork:
-    """Create a new neural network instance with time-based randomness."""
-    return SimpleNeuralNetwork()
+def create_dynamic_neural_network(
+    rng: np.random.Generator | None = None,
+    dtype: DTypeLike = np.float64,
+    quantize: bool = False,
+) -> SimpleNeuralNetwork:
+    """Create a new neural network instance with weights drawn from ``rng``."""
+    return SimpleNeuralNetwork(rng=rng, dtype=dtype, quantize=quantize)
 
 
-def infer_current_action(result: QuantumSimulationResult) -> NeuralReadout:
+@stage
+def infer_current_action(
+    result: QuantumSimulationResult, rng: np.random.Generator | None = None
+) -> NeuralReadout:
     """Infer the action from the quantum simulation measurements.
 
     Parameters
     ----------
     result : QuantumSimulationResult
         The quantum simulation result containing probabilities
+    rng : np.random.Generator | None
+        Source of the network weights, the quantum noise and the forward-pass
+        noise, drawn in that order. A fresh, OS-seeded generator is used when
+        omitted; pass a seeded one to make the inference replayable.
 
     Returns
     -------
     NeuralReadout
         The activations, threshold, bits and action for this run.
     """
+    if rng is None:
+        rng = np.random.default_rng()
+
     # Create a fresh neural network for each inference (more dynamic)
-    neural_network = create_dynamic_neural_network()
+    neural_network = create_dynamic_neural_network(rng)
 
     # Convert to neural network inputs
     print("\n🧠 Converting to Neural Network Inputs...")
     dense_input = np.array(result.probabilities_vector)
 
     # Add some quantum-inspired randomness based on entropy
-    quantum_noise = result.entropy * 0.1 * np.random.randn(len(dense_input))
-    augmented_input = dense_input + quantum_noise
+    augmented_input = network_inputs(
+        dense_input,
+        rng.standard_normal(len(dense_input)),
+        neural_network.input_size,
+    )
 
     print(f"🔮 Input probabilities: {dense_input}")
     print(f"🌊 Quantum entropy: {result.entropy:.3f}")
@@ -208,10 +512,6 @@ def infer_current_action(result: QuantumSimulationResult) -> NeuralReadout:
     print("🔮 Running Neural Network Inference...")
     activations, threshold, bits = neural_network.predict_bits(augmented_input)
     action_index = neural_network.bits_to_action_index(bits)
-
-    # Ensure index is within bounds
-    action_index = action_index % len(STATE_LIST)
-
     predicted_action = STATE_LIST[action_index]
 
     print(
@@ -222,7 +522,7 @@ def infer_current_action(result: QuantumSimulationResult) -> NeuralReadout:
 
     return NeuralReadout(
         activations=[float(a) for a in activations],
-        threshold=threshold,
+        threshold=float(threshold),
         bits=[int(b) for b in bits],
         index=action_index,
         action=str(predicted_action),
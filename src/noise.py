@@ -0,0 +1,118 @@
+"""Device noise for the Aer simulation.
+
+An ideal run's "measured" histogram is the statevector plus shot noise. A
+``NoiseConfig`` adds what a real device does to the ``create_circuit`` gates:
+depolarizing error, thermal relaxation over each gate's duration, and readout
+error. Noise models are built once per configuration and reused.
+
+Each gate's depolarizing and relaxation errors are fused into one Kraus
+channel. Aer would otherwise carry their composition as a mixture of every
+combination of terms, over 1700 for the Toffoli, and serialize it on every
+job, which costs more than simulating the circuit.
+"""
+
+from __future__ import annotations
+
+import functools
+from dataclasses import dataclass
+
+from qiskit.quantum_info import Kraus, SuperOp
+from qiskit_aer.noise import (
+    NoiseModel,
+    QuantumError,
+    ReadoutError,
+    depolarizing_error,
+    thermal_relaxation_error,
+)
+
+# Above this many qubits a density matrix (4**n entries) no longer fits
+# comfortably in memory, whatever the shot count.
+MAX_DENSITY_MATRIX_QUBITS = 14
+
+
+@dataclass(frozen=True)
+class NoiseConfig:
+    """Error rates and timings of a device; hashable, so it keys the caches."""
+
+    depolarizing_1q: float = 1e-3
+    depolarizing_2q: float = 1e-2
+    depolarizing_3q: float = 2e-2
+    readout_error: float = 2e-2
+    t1: float = 100e-6  # seconds
+    t2: float = 80e-6  # seconds; at most 2 * t1
+    gate_time_1q: float = 50e-9
+    gate_time_2q: float = 300e-9
+    gate_time_3q: float = 600e-9
+
+
+def _gate_error(
+    depolarizing: float, config: NoiseConfig, gate_time: float, n: int
+) -> QuantumError:
+    """Depolarizing then thermal relaxation on ``n`` qubits, as one channel."""
+    # Composed as superoperators: composing the QuantumErrors first would
+    # expand the very mixture the Kraus form avoids before converting it.
+    relaxation = SuperOp(
+        thermal_relaxation_error(config.t1, config.t2, gate_time).to_quantumchannel()
+    )
+    channel = relaxation
+    for _ in range(n - 1):
+        channel = channel.tensor(relaxation)
+    depolarizing_channel = depolarizing_error(depolarizing, n).to_quantumchannel()
+    return QuantumError(Kraus(SuperOp(depolarizing_channel).compose(channel)))
+
+
+@functools.cache
+def build_noise_model(config: NoiseConfig) -> NoiseModel:
+    """Build, once per configuration, the noise model for ``config``.
+
+    Parameters
+    ----------
+    config : NoiseConfig
+        The device to model
+
+    Returns
+    -------
+    NoiseModel
+        Errors on the gates ``create_circuit`` uses (h, ry, cx, ccx), on
+        x and sx, and on every measurement. Shared between callers; do not modify it.
+    """
+    model = NoiseModel()
+    model.add_all_qubit_quantum_error(
+        _gate_error(config.depolarizing_1q, config, config.gate_time_1q, 1),
+        ["h", "ry", "x", "sx"],
+    )
+    model.add_all_qubit_quantum_error(
+        _gate_error(config.depolarizing_2q, config, config.gate_time_2q, 2), ["cx"]
+    )
+    model.add_all_qubit_quantum_error(
+        _gate_error(config.depolarizing_3q, config, config.gate_time_3q, 3), ["ccx"]
+    )
+    p = config.readout_error
+    model.add_all_qubit_readout_error(ReadoutError([[1 - p, p], [p, 1 - p]]))
+    return model
+
+
+def choose_method(num_qubits: int, shots: int) -> str:
+    """Pick the cheaper Aer method for a noisy run.
+
+    A density matrix is evolved once, at ~4**n work per gate, and then
+    sampled. Trajectories evolve a 2**n statevector per shot, which Aer's shot
+    branching batches but cannot make cheaper than one trajectory per distinct
+    error outcome. Density matrices therefore win while 2**n stays below the
+    shot count and the matrix fits in memory.
+
+    Parameters
+    ----------
+    num_qubits : int
+        Width of the circuit
+    shots : int
+        Shots per run
+
+    Returns
+    -------
+    str
+        ``"density_matrix"`` or ``"statevector"``.
+    """
+    if num_qubits <= MAX_DENSITY_MATRIX_QUBITS and 2**num_qubits < shots:
+        return "density_matrix"
+    return "statevector"
@@ -0,0 +1,105 @@
+"""Run pipeline stages as a dependency graph, overlapping independent ones.
+
+Most of a run is a chain (measure -> infer -> render), but several stages only
+meet at the end: the statevector analysis and the Aer simulation both need just
+the circuit, and reading the fonts and compiling the template need nothing at
+all. ``run_graph`` starts every stage as soon as its inputs exist, on a thread
+pool sized by the ``Concurrency`` budget, so a run takes as long as its
+critical path rather than the sum of its stages. Aer, NumPy and file reads
+release the GIL, so the overlap is real.
+
+A stage receives its dependencies' outputs as positional arguments, in the
+order it lists them, and must not rely on anything else another stage does.
+Stages that draw from a shared ``np.random.Generator`` must be chained, so the
+draws happen in the same order on every run.
+"""
+
+from __future__ import annotations
+
+import graphlib
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any
+
+from concurrency import current
+from profiling import profiler_active
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Mapping
+    from concurrent.futures import Future
+
+    from concurrency import Concurrency
+
+
+@dataclass(frozen=True)
+class Task:
+    """A stage: ``fn(*outputs of deps)``, runnable once its deps are done."""
+
+    fn: Callable[..., Any]
+    deps: tuple[str, ...] = ()
+
+
+def _sorter(tasks: Mapping[str, Task]) -> graphlib.TopologicalSorter[str]:
+    for name, task in tasks.items():
+        missing = [dep for dep in task.deps if dep not in tasks]
+        if missing:
+            raise ValueError(f"task {name!r} depends on unknown {missing}")
+    return graphlib.TopologicalSorter({n: t.deps for n, t in tasks.items()})
+
+
+def run_graph(
+    tasks: Mapping[str, Task], concurrency: Concurrency | None = None
+) -> dict[str, Any]:
+    """Run every task once, each as soon as the tasks it depends on finish.
+
+    The first exception raised by a task propagates; tasks not yet started are
+    then skipped, and the call returns once the running ones finish. A
+    dependency on an unknown name raises ``ValueError`` and a cycle
+    ``graphlib.CycleError``, both before any task runs.
+
+    Parameters
+    ----------
+    tasks : Mapping[str, Task]
+        The graph, by task name
+    concurrency : Concurrency | None
+        Budget of the run, by default the current one. Up to ``threads``
+        tasks run at once; with one thread, or while a ``Profiler`` is active
+        (it only records the thread that opened it), tasks run one after
+        another on the calling thread.
+
+    Returns
+    -------
+    dict[str, Any]
+        Each task's return value, by task name.
+    """
+    if concurrency is None:
+        concurrency = current()
+    max_workers = 1 if profiler_active() else concurrency.threads
+    sorter = _sorter(tasks)
+    outputs: dict[str, Any] = {}
+
+    def call(name: str) -> Any:
+        task = tasks[name]
+        return task.fn(*(outputs[dep] for dep in task.deps))
+
+    if max_workers <= 1:
+        for name in sorter.static_order():
+            outputs[name] = call(name)
+        return outputs
+
+    sorter.prepare()
+    with ThreadPoolExecutor(max_workers, thread_name_prefix="stage") as pool:
+        running: dict[Future[Any], str] = {}
+        try:
+            while sorter.is_active():
+                for name in sorter.get_ready():
+                    running[pool.submit(call, name)] = name
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    outputs[name] = future.result()
+                    sorter.done(name)
+        finally:
+            for future in running:
+                future.cancel()
+    return outputs
@@ -0,0 +1,190 @@
+"""In-place profiling of the pipeline.
+
+``Profiler`` wraps a run and writes two files: a ``pstats`` dump from cProfile
+(for ``python -m pstats`` or snakeviz) and a ``.collapsed`` file of sampled
+stacks, one ``frame;frame;frame count`` line per distinct stack, which is the
+input format of flamegraph.pl, speedscope and inferno.
+
+Pipeline functions mark themselves with ``@stage``. When the profiler is
+restricted to some stages, both cProfile and the sampler only record while one
+of those stages is on the stack, so e.g. ``simulate_circuit`` can be profiled
+without the Jinja render drowning it out. Outside a profiled run ``@stage``
+costs a single global lookup per call.
+"""
+
+from __future__ import annotations
+
+import cProfile
+import functools
+import sys
+import threading
+from collections import Counter
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterator
+    from types import FrameType, TracebackType
+
+DEFAULT_INTERVAL = 0.001  # seconds between stack samples
+
+# Every function decorated with @stage, by name, so callers can validate filters.
+STAGES: set[str] = set()
+
+_active: Profiler | None = None
+
+
+def stage[**P, R](fn: Callable[P, R]) -> Callable[P, R]:
+    """Mark ``fn`` as a pipeline stage that a ``Profiler`` can filter on."""
+    name = fn.__name__
+    STAGES.add(name)
+
+    @functools.wraps(fn)
+    def wrapper(*args: P.args, **kwargs: P.kwargs) -> R:
+        profiler = _active
+        if profiler is None:
+            return fn(*args, **kwargs)
+        profiler._enter(name)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            profiler._exit(name)
+
+    return wrapper
+
+
+def profiler_active() -> bool:
+    """Tell whether a ``Profiler`` is recording."""
+    # cProfile, the sampler and the stage filter all follow the thread that
+    # opened the profiler, so code that would hand stages to other threads
+    # should keep them on this one while this is true.
+    return _active is not None
+
+
+def _frame_label(frame: FrameType) -> str:
+    code = frame.f_code
+    return f"{Path(code.co_filename).stem}:{code.co_qualname}"
+
+
+def _walk(frame: FrameType | None) -> Iterator[FrameType]:
+    while frame is not None:
+        yield frame
+        frame = frame.f_back
+
+
+class Profiler:
+    """Profile everything run inside ``with Profiler(...):``."""
+
+    def __init__(
+        self,
+        output: Path,
+        interval: float | None = None,
+        stages: frozenset[str] = frozenset(),
+    ):
+        """Configure a profiling session.
+
+        Parameters
+        ----------
+        output : Path
+            Where the pstats dump goes; the collapsed stacks are written next
+            to it, as ``<output>.collapsed``
+        interval : float | None
+            Seconds between stack samples, by default ``DEFAULT_INTERVAL``
+        stages : frozenset[str]
+            Only record while one of these ``@stage`` functions is running.
+            Everything is recorded when empty.
+        """
+        self.output = output
+        self.interval = DEFAULT_INTERVAL if interval is None else interval
+        self.stages = stages
+        self.samples: Counter[str] = Counter()
+        self._profile = cProfile.Profile()
+        self._depth = 0  # nesting depth of selected stages
+        self._thread_id = threading.get_ident()
+        self._stop = threading.Event()
+        self._sampler = threading.Thread(
+            target=self._sample, name="profiler-sampler", daemon=True
+        )
+
+    @property
+    def _recording(self) -> bool:
+        return not self.stages or self._depth > 0
+
+    def __enter__(self) -> Profiler:
+        """Start recording and make this the profiler ``@stage`` reports to.
+
+        Returns
+        -------
+        Profiler
+            This profiler.
+
+        Raises
+        ------
+        RuntimeError
+            If another profiler is already active.
+        """
+        global _active
+        if _active is not None:
+            raise RuntimeError("a Profiler is already active")
+        _active = self
+        self._thread_id = threading.get_ident()
+        if not self.stages:
+            self._profile.enable()
+        self._sampler.start()
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        tb: TracebackType | None,
+    ) -> None:
+        """Stop recording and write the pstats and collapsed-stack files."""
+        global _active
+        if self._recording:
+            self._profile.disable()
+        self._stop.set()
+        self._sampler.join()
+        _active = None
+        self._write()
+
+    def _enter(self, name: str) -> None:
+        # The stage filter follows the thread that opened the profiler, as does
+        # the sampler; work a stage hands to other threads is still recorded.
+        if name not in self.stages or threading.get_ident() != self._thread_id:
+            return
+        self._depth += 1
+        if self._depth == 1:
+            self._profile.enable()
+
+    def _exit(self, name: str) -> None:
+        if name not in self.stages or threading.get_ident() != self._thread_id:
+            return
+        self._depth -= 1
+        if self._depth == 0:
+            self._profile.disable()
+
+    def _sample(self) -> None:
+        while not self._stop.wait(self.interval):
+            if not self._recording:
+                continue
+            frame = sys._current_frames().get(self._thread_id)
+            if frame is None:
+                continue
+            # Leave out the @stage wrappers; they are noise in every stack.
+            stack = [
+                _frame_label(f)
+                for f in _walk(frame)
+                if f.f_code.co_filename != __file__
+            ]
+            self.samples[";".join(reversed(stack))] += 1
+
+    def _write(self) -> None:
+        self.output.parent.mkdir(parents=True, exist_ok=True)
+        self._profile.dump_stats(self.output)
+        collapsed = self.output.with_name(self.output.name + ".collapsed")
+        collapsed.write_text(
+            "".join(f"{stack} {n}\n" for stack, n in self.samples.most_common()),
+            encoding="utf-8",
+        )
+        print(f"⏱️ Wrote {self.output} and {collapsed}")
@@ -1,12 +1,17 @@
 from __future__ import annotations
 
+import functools
 from datetime import datetime
+from typing import TYPE_CHECKING
 
 import numpy as np
 from qiskit import ClassicalRegister, QuantumCircuit, QuantumRegister, transpile
-from qiskit.quantum_info import Statevector
 from qiskit_aer import AerSimulator
+from qiskit_aer.library import SaveProbabilities
 
+from checkpoints import StateCheckpoints
+from concurrency import current
+from metrics import counts_matrix, distribution_metrics
 from models.quantum import (
     CircuitInfo,
     NeuralInterpretation,
@@ -15,6 +20,18 @@ from models.quantum import (
     QuantumSimulationResult,
     StateAnalysis,
 )
+from noise import build_noise_model, choose_method
+from pipeline import Task, run_graph
+from profiling import stage
+
+if TYPE_CHECKING:
+    from collections.abc import Mapping, Sequence
+
+    from qiskit.circuit import Parameter
+    from qiskit.quantum_info import Statevector
+
+    from concurrency import Concurrency
+    from noise import NoiseConfig
 
 """
 ⚛️ JORGE'S QUANTUM CIRCUIT
@@ -29,8 +46,27 @@ This script implements the quantum circuit shown in the banner:
 """
 
 
-def create_circuit(num_qubits: int, num_classical: int) -> QuantumCircuit:
-    """Create the quantum circuit matching the banner design."""
+@stage
+def create_circuit(
+    num_qubits: int, num_classical: int, phi: float | Parameter = np.pi / 3
+) -> QuantumCircuit:
+    """Create the quantum circuit matching the banner design.
+
+    Parameters
+    ----------
+    num_qubits : int
+        Number of qubits in the circuit
+    num_classical : int
+        Number of classical bits in the circuit
+    phi : float | Parameter
+        Angle of the ``ry`` on the caffeinated qubit, by default π/3. Pass a
+        ``Parameter`` to bind it later, e.g. in ``simulate_bindings``.
+
+    Returns
+    -------
+    QuantumCircuit
+        The circuit, barrier-separated into layers and measured at the end.
+    """
     # Create quantum and classical registers
     qreg = QuantumRegister(num_qubits, "q")
     creg = ClassicalRegister(num_classical, "c")
@@ -54,7 +90,6 @@ def create_circuit(num_qubits: int, num_classical: int) -> QuantumCircuit:
 
     # Layer 4: Y rotation on caffeinated state
     circuit.barrier()
-    phi = np.pi / 3  # Caffeinated parameter
     circuit.ry(phi, 2)  # Y-rotation on caffeinated state
 
     # Layer 5: Three-qubit entanglement - Breakthrough moment!
@@ -69,29 +104,75 @@ def create_circuit(num_qubits: int, num_classical: int) -> QuantumCircuit:
     return circuit
 
 
-def simulate_circuit(circuit: QuantumCircuit, shots=8192) -> QuantumSimulationResult:
-    """Simulate the quantum circuit using Aer simulator."""
-    # Use Aer simulator
-    simulator = AerSimulator()
-
-    # Transpile circuit for simulator
-    transpiled_circuit = transpile(circuit, simulator)
+# Statevectors after each layer of recently analysed circuits
+_checkpoints = StateCheckpoints()
+
+
+def get_simulator(
+    concurrency: Concurrency | None = None,
+    noise: NoiseConfig | None = None,
+    method: str = "automatic",
+) -> AerSimulator:
+    """Return the shared simulator for a thread budget, noise model and method.
+
+    Parameters
+    ----------
+    concurrency : Concurrency | None
+        Thread budget, by default the current one
+    noise : NoiseConfig | None
+        Device noise to apply; ideal gates and readout when omitted
+    method : str
+        Aer simulation method, by default Aer's own choice
+
+    Returns
+    -------
+    AerSimulator
+        One instance per distinct argument set, reused across calls.
+    """
+    return _simulator(
+        concurrency if concurrency is not None else current(), noise, method
+    )
 
-    # Run simulation
-    job = simulator.run(transpiled_circuit, shots=shots)
-    raw_result = job.result()
 
-    counts: dict[str, int] = raw_result.get_counts()
+@functools.cache
+def _simulator(
+    concurrency: Concurrency, noise: NoiseConfig | None, method: str
+) -> AerSimulator:
+    # Building an AerSimulator and its transpiler target is a large share of a
+    # small run, so it is done once per configuration and reused.
+    options = concurrency.aer_options()
+    if noise is not None:
+        options["noise_model"] = build_noise_model(noise)
+    if method == "statevector" and noise is not None:
+        # Branch trajectories only where a noise term actually fires, so shots
+        # that share their error outcomes share one statevector.
+        options["shot_branching_enable"] = True
+    return AerSimulator(method=method, **options)
+
+
+def _backend(
+    circuits: Sequence[QuantumCircuit], shots: int, noise: NoiseConfig | None
+) -> AerSimulator:
+    """Pick the simulator for a batch: ideal, or noisy with the cheaper method."""
+    if noise is None:
+        return get_simulator()
+    width = max(c.num_qubits for c in circuits)
+    return get_simulator(noise=noise, method=choose_method(width, shots))
+
+
+def _result_from_counts(counts: dict[str, int]) -> QuantumSimulationResult:
+    """Derive the simulation statistics from one circuit's counts."""
     total_shots = sum(counts.values())
 
-    # Standardize probabilities
-    # Convert 001 000 to 001
-    standardized_probabilities: dict[str, float] = {}
-    for bitstring, count in counts.items():
-        bits = bitstring[0:3]
-        standardized_probabilities[bits] = count / total_shots
-
-    probabilities_vector = np.array(list(standardized_probabilities.values()))
+    # Keys carry every register ("001 000"); the first group is the measured
+    # one. Several keys can share it, so shots are summed, in basis order.
+    width = len(next(iter(counts)).split()[0])
+    probabilities_vector = counts_matrix([counts], width)[0] / total_shots
+    standardized_probabilities = {
+        format(state, f"0{width}b"): float(p)
+        for state, p in enumerate(probabilities_vector)
+        if p > 0
+    }
 
     entropy = float(-np.sum([p * np.log2(p) for p in probabilities_vector if p > 0]))
     max_prob = float(np.max(probabilities_vector))
@@ -107,22 +188,160 @@ def simulate_circuit(circuit: QuantumCircuit, shots=8192) -> QuantumSimulationRe
     )
 
 
-def get_quantum_state_before_measurement(circuit: QuantumCircuit) -> Statevector:
-    """Get the quantum state vector before measurement."""
-    # Create circuit without measurements for state analysis
-    analysis_circuit = QuantumCircuit(circuit.num_qubits)
-
-    # Copy all non-measurement operations
-    for instruction in circuit.data:
-        if instruction.operation.name not in ["measure", "barrier"]:
-            analysis_circuit.append(
-                instruction.operation, instruction.qubits, instruction.clbits
-            )
+def _run_batch(
+    backend: AerSimulator,
+    transpiled: list[QuantumCircuit],
+    shots: int,
+    rng: np.random.Generator | None,
+) -> list[QuantumSimulationResult]:
+    """Submit already-transpiled circuits as one job and split the result."""
+    seed = None if rng is None else int(rng.integers(2**31))
+    job = backend.run(transpiled, shots=shots, seed_simulator=seed)
+    raw_result = job.result()
+    return [
+        _result_from_counts(raw_result.get_counts(i)) for i in range(len(transpiled))
+    ]
+
+
+@stage
+def simulate_circuits(
+    circuits: Sequence[QuantumCircuit],
+    shots: int = 8192,
+    rng: np.random.Generator | None = None,
+    noise: NoiseConfig | None = None,
+) -> list[QuantumSimulationResult]:
+    """Simulate many circuits in a single submission to the shared simulator.
+
+    Parameters
+    ----------
+    circuits : Sequence[QuantumCircuit]
+        The circuits to run, including their measurements
+    shots : int
+        Number of shots per circuit, by default 8192
+    rng : np.random.Generator | None
+        Source of the job's simulator seed, drawn once per call. Aer seeds
+        itself when omitted.
+    noise : NoiseConfig | None
+        Device noise to simulate, by default none
+
+    Returns
+    -------
+    list[QuantumSimulationResult]
+        One result per circuit, in input order.
+    """
+    if not circuits:
+        return []
+    backend = _backend(circuits, shots, noise)
+    transpiled = transpile(list(circuits), backend)
+    return _run_batch(backend, transpiled, shots, rng)
+
+
+@stage
+def simulate_bindings(
+    circuit: QuantumCircuit,
+    bindings: Sequence[Mapping[Parameter, float]],
+    shots: int = 8192,
+    rng: np.random.Generator | None = None,
+    noise: NoiseConfig | None = None,
+) -> list[QuantumSimulationResult]:
+    """Simulate one parameterized circuit under many bindings in one submission.
+
+    The circuit is transpiled once with its parameters unbound; only the cheap
+    binding step is repeated per variant.
+
+    Parameters
+    ----------
+    circuit : QuantumCircuit
+        A circuit with unbound parameters, including its measurements
+    bindings : Sequence[Mapping[Parameter, float]]
+        One value per parameter for each variant to run
+    shots : int
+        Number of shots per variant, by default 8192
+    rng : np.random.Generator | None
+        Source of the job's simulator seed, drawn once per call
+    noise : NoiseConfig | None
+        Device noise to simulate, by default none
+
+    Returns
+    -------
+    list[QuantumSimulationResult]
+        One result per binding, in input order.
+    """
+    if not bindings:
+        return []
+    backend = _backend([circuit], shots, noise)
+    transpiled = transpile(circuit, backend)
+    bound = [transpiled.assign_parameters(dict(b)) for b in bindings]
+    return _run_batch(backend, bound, shots, rng)
+
+
+@stage
+def exact_probabilities(
+    circuit: QuantumCircuit, bindings: Sequence[Mapping[Parameter, float]]
+) -> np.ndarray:
+    """Born probabilities of a parameterized circuit under many bindings.
+
+    Like ``simulate_bindings``, the circuit is transpiled once and every
+    variant goes to Aer in one submission, but each variant's final state is
+    read out exactly instead of sampled, so differences between variants carry
+    no shot noise.
+
+    Parameters
+    ----------
+    circuit : QuantumCircuit
+        A circuit with unbound parameters; final measurements are ignored
+    bindings : Sequence[Mapping[Parameter, float]]
+        One value per parameter for each variant
+
+    Returns
+    -------
+    np.ndarray
+        (len(bindings), 2**num_qubits) probabilities, in basis order.
+    """
+    analysis = circuit.remove_final_measurements(inplace=False)
+    analysis.append(SaveProbabilities(analysis.num_qubits), analysis.qubits)
+    backend = get_simulator(method="statevector")
+    transpiled = transpile(analysis, backend)
+    bound = [transpiled.assign_parameters(dict(b)) for b in bindings]
+    if not bound:
+        return np.empty((0, 2**analysis.num_qubits))
+    result = backend.run(bound, shots=1).result()
+    return np.array([result.data(i)["probabilities"] for i in range(len(bound))])
+
+
+@stage
+def simulate_circuit(
+    circuit: QuantumCircuit,
+    shots=8192,
+    rng: np.random.Generator | None = None,
+    noise: NoiseConfig | None = None,
+) -> QuantumSimulationResult:
+    """Simulate the quantum circuit using Aer simulator.
+
+    Parameters
+    ----------
+    circuit : QuantumCircuit
+        The circuit to run, including its measurements
+    shots : int
+        Number of shots, by default 8192
+    rng : np.random.Generator | None
+        Source of the simulator seed, so the same generator state always yields
+        the same counts. Aer seeds itself when omitted.
+    noise : NoiseConfig | None
+        Device noise to simulate, by default none
+
+    Returns
+    -------
+    QuantumSimulationResult
+        The counts and the statistics derived from them.
+    """
+    return simulate_circuits([circuit], shots=shots, rng=rng, noise=noise)[0]
 
-    # Get state_vector using the correct method
-    state_vector = Statevector.from_instruction(analysis_circuit)
 
-    return state_vector
+def get_quantum_state_before_measurement(circuit: QuantumCircuit) -> Statevector:
+    """Get the quantum state vector before measurement."""
+    # Layers shared with recently analysed circuits are not recomputed.
+    return _checkpoints.evolve(circuit)
 
 
 def calculate_entanglement(state_vector: Statevector, num_qubits: int) -> float:
@@ -145,6 +364,7 @@ def calculate_coherence(state_vector: Statevector) -> float:
     return float(coherence)
 
 
+@stage
 def analyze_quantum_properties(
     circuit: QuantumCircuit, num_qubits: int
 ) -> QuantumProperties:
@@ -182,10 +402,17 @@ def visualize_results(
     pass
 
 
+@stage
 def generate_circuit_report(
-    circuit: QuantumCircuit, properties: QuantumProperties, num_qubits: int
+    circuit: QuantumCircuit,
+    properties: QuantumProperties,
+    num_qubits: int,
+    rng: np.random.Generator | None = None,
 ) -> QuantumCircuitReport:
     """Generate a comprehensive report of the quantum circuit."""
+    if rng is None:
+        rng = np.random.default_rng()
+
     report = QuantumCircuitReport(
         circuit_info=CircuitInfo(
             name="Jorge's Quantum Neural Circuit",
@@ -210,7 +437,7 @@ def generate_circuit_report(
         neural_interpretation=NeuralInterpretation(
             consciousness_level=properties.entanglement_measure,
             creativity_index=properties.quantum_coherence,
-            innovation_potential=np.random.uniform(0.8, 1.0),
+            innovation_potential=float(rng.uniform(0.8, 1.0)),
             problem_solving_capability="Quantum-Enhanced",
         ),
         circuit_ascii=str(circuit.draw(output="text")),
@@ -240,30 +467,115 @@ def show_actual_probabilities(result: QuantumSimulationResult):
         print(f"  |{bits}⟩: {count} shots ({percentage:.2f}%)")
 
 
+@stage
+def compare_with_theory(
+    properties: QuantumProperties, result: QuantumSimulationResult, num_qubits: int
+) -> QuantumSimulationResult:
+    """Attach theory-vs-measurement distances to a simulation result.
+
+    Parameters
+    ----------
+    properties : QuantumProperties
+        The statevector analysis supplying the theoretical distribution
+    result : QuantumSimulationResult
+        The measured result
+    num_qubits : int
+        Number of measured qubits
+
+    Returns
+    -------
+    QuantumSimulationResult
+        A copy of ``result`` with ``metrics`` filled in.
+    """
+    theory = np.zeros(2**num_qubits)
+    for state, prob in properties.probability_distribution.items():
+        theory[int(state, 2)] = prob
+    counts = counts_matrix([result.counts], num_qubits)
+    metrics = distribution_metrics(theory, counts).row(0)
+    return result.model_copy(update={"metrics": metrics})
+
+
+def show_distribution_metrics(result: QuantumSimulationResult):
+    """Show how far the measurement landed from the theoretical distribution."""
+    if (m := result.metrics) is None:
+        return
+    print(f"  TVD: {m.total_variation:.4f} · Hellinger: {m.hellinger:.4f}")
+    print(f"  KL: {m.kl_divergence:.5f} bits · fidelity: {m.fidelity:.5f}")
+    print(f"  χ²: {m.chi_square:.2f} (p = {m.chi_square_p_value:.3f})")
+
+
+@stage
 def run_full_analysis(
-    num_qubits: int, num_classical: int
+    num_qubits: int,
+    num_classical: int,
+    rng: np.random.Generator | None = None,
+    shots: int = 8192,
+    noise: NoiseConfig | None = None,
+    phi: float = np.pi / 3,
 ) -> tuple[QuantumCircuitReport, QuantumSimulationResult]:
-    """Run complete quantum circuit analysis."""
+    """Run complete quantum circuit analysis.
+
+    Parameters
+    ----------
+    num_qubits : int
+        Number of qubits in the circuit
+    num_classical : int
+        Number of classical bits in the circuit
+    rng : np.random.Generator | None
+        Supplies the simulator seed and then the report's innovation potential,
+        in that order. A fresh, OS-seeded generator is used when omitted.
+    shots : int
+        Number of simulation shots, by default 8192
+    noise : NoiseConfig | None
+        Device noise to simulate; the theory comparison then measures how far
+        the noise pulls the counts from the ideal distribution
+    phi : float
+        Angle of the circuit's ``ry`` gate, by default π/3
+
+    Returns
+    -------
+    tuple[QuantumCircuitReport, QuantumSimulationResult]
+        The circuit report and the measured result.
+    """
+    if rng is None:
+        rng = np.random.default_rng()
+
     # Create and simulate circuit
-    circuit: QuantumCircuit = create_circuit(num_qubits, num_classical)
+    circuit: QuantumCircuit = create_circuit(num_qubits, num_classical, phi)
 
     # Print circuit
     print("\n📊 Quantum Circuit Diagram:")
     print(circuit.draw(output="text"))
 
-    # Analyze properties
     print("\n⚛️ Analyzing quantum properties...")
-    properties = analyze_quantum_properties(circuit, num_qubits)
+    print("🔬 Running quantum simulation...")
+
+    # The statevector analysis and the Aer run only share the circuit, so they
+    # overlap. The report draws from rng after the simulator seed, so it waits
+    # for the simulation.
+    outputs = run_graph(
+        {
+            "properties": Task(lambda: analyze_quantum_properties(circuit, num_qubits)),
+            "result": Task(
+                lambda: simulate_circuit(circuit, shots=shots, rng=rng, noise=noise)
+            ),
+            "report": Task(
+                lambda properties, _: generate_circuit_report(
+                    circuit, properties, num_qubits, rng
+                ),
+                deps=("properties", "result"),
+            ),
+        }
+    )
+    properties: QuantumProperties = outputs["properties"]
+    result: QuantumSimulationResult = outputs["result"]
+    report: QuantumCircuitReport = outputs["report"]
+    print("✅ Simulation complete")
 
     print(f"\n🔗 Entanglement Measure: {properties.entanglement_measure:.3f}")
     print(f"🌊 Quantum Coherence: {properties.quantum_coherence:.3f}")
     print(f"🎯 Active Quantum States: {len(properties.probability_distribution)}")
 
-    # Simulate
-    print("\n🔬 Running quantum simulation...")
-    result: QuantumSimulationResult = simulate_circuit(circuit, shots=8192)
-    print("✅ Simulation complete")
-
     # Show theoretical vs actual comparison
     print("\n🏆 Theoretical Quantum State Probabilities:")
     show_theoretical_probabilities(properties)
@@ -272,11 +584,12 @@ def run_full_analysis(
     print("\n🎲 Actual Measurement Results:")
     show_actual_probabilities(result)
 
-    # Generate report
-    print("\n📋 Generating report...")
-    report = generate_circuit_report(circuit, properties, num_qubits)
+    # Compare the two
+    print("\n📐 Theory vs. Measurement:")
+    result = compare_with_theory(properties, result, num_qubits)
+    show_distribution_metrics(result)
 
-    print("✅ Analysis complete!")
+    print("\n✅ Analysis complete!")
     print("📁 Results saved to assets/")
     print("=" * 60)
     print("⚛️ Quantum consciousness: ACTIVE")
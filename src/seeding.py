@@ -0,0 +1,50 @@
+"""Seed plumbing for reproducible, independent runs.
+
+Every stochastic stage takes an explicit ``np.random.Generator``; none of them
+touch the global ``np.random`` state. A run is identified by one root
+``SeedSequence`` whose children feed the individual stages, so N runs can
+execute side by side in threads or processes without sharing a stream, and any
+one of them can be replayed from its root entropy alone.
+"""
+
+from __future__ import annotations
+
+from typing import NamedTuple
+
+import numpy as np
+
+
+class RunSeeds(NamedTuple):
+    """The per-stage children of one run's root seed."""
+
+    quantum: np.random.SeedSequence  # simulator seed, report noise
+    network: np.random.SeedSequence  # weights, input noise, forward noise
+
+
+def child(seq: np.random.SeedSequence, index: int) -> np.random.SeedSequence:
+    """Derive child ``index`` of ``seq`` without mutating it.
+
+    ``SeedSequence.spawn`` counts how many children it has handed out, so
+    calling it twice yields different streams. Deriving the child from the
+    spawn key keeps the mapping a pure function of ``(seq, index)``.
+
+    Parameters
+    ----------
+    seq : np.random.SeedSequence
+        The parent seed
+    index : int
+        Which child to derive
+
+    Returns
+    -------
+    np.random.SeedSequence
+        The same child ``seq.spawn`` would have produced at that position.
+    """
+    return np.random.SeedSequence(
+        seq.entropy, spawn_key=(*seq.spawn_key, index), pool_size=seq.pool_size
+    )
+
+
+def run_seeds(root: np.random.SeedSequence) -> RunSeeds:
+    """Split a run's root seed into one independent child per stage."""
+    return RunSeeds(quantum=child(root, 0), network=child(root, 1))
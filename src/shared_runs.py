@@ -0,0 +1,244 @@
+"""Fan runs out over worker processes without pickling their results.
+
+Sending each run's ``QuantumSimulationResult`` and ``NeuralReadout`` back
+through a pool pickles pydantic models and count dicts, and the parent ends up
+spending its time unpickling. Here the parent allocates one
+``multiprocessing.shared_memory`` block holding a structured array with one
+``run_dtype`` record per run. Workers attach to it, write their runs' counts,
+probabilities and readouts straight into their own rows, and return only the
+``(start, stop)`` range they filled. The parent then reads the array in place.
+
+Run ``i`` is seeded by ``run_seeds(child(SeedSequence(seed), i))``, as in
+``stream``, and each worker runs the real pipeline (``simulate_circuit`` then
+``infer_current_action``). The result is the same however the runs are split
+into chunks or spread over workers.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import io
+import sys
+import traceback
+from multiprocessing import shared_memory
+from typing import TYPE_CHECKING, NamedTuple
+
+import numpy as np
+
+from concurrency import Concurrency
+from metrics import counts_matrix
+from nn import infer_current_action
+from quantum_circuit_qiskit import create_circuit, simulate_circuit
+from seeding import child, run_seeds
+
+if TYPE_CHECKING:
+    from types import TracebackType
+
+DEFAULT_CHUNK = 32  # runs per task; large enough to amortize task overhead
+
+
+def run_dtype(num_qubits: int = 3, outputs: int = 4) -> np.dtype:
+    """Record layout of one run in the shared array.
+
+    Parameters
+    ----------
+    num_qubits : int
+        Measured qubits, by default 3
+    outputs : int
+        Output neurons of the network, by default 4
+
+    Returns
+    -------
+    np.dtype
+        A packed structured dtype: basis-ordered ``counts`` and
+        ``probabilities``, then the readout's ``activations``, ``threshold``,
+        ``bits`` and ``action_index``.
+    """
+    states = 2**num_qubits
+    return np.dtype(
+        [
+            ("counts", np.int64, (states,)),
+            ("probabilities", np.float64, (states,)),
+            ("activations", np.float64, (outputs,)),
+            ("threshold", np.float64),
+            ("bits", np.uint8, (outputs,)),
+            ("action_index", np.int64),
+        ]
+    )
+
+
+class Filled(NamedTuple):
+    """What a worker sends back: the rows it wrote."""
+
+    start: int
+    stop: int
+
+
+def _fill_rows(
+    runs: np.ndarray, master: np.random.SeedSequence, start: int, stop: int, shots: int
+) -> None:
+    num_qubits = runs.dtype["counts"].shape[0].bit_length() - 1
+    circuit = create_circuit(num_qubits, num_qubits)
+    for i in range(start, stop):
+        seeds = run_seeds(child(master, i))
+        with contextlib.redirect_stdout(io.StringIO()):  # the stages narrate
+            result = simulate_circuit(
+                circuit, shots=shots, rng=np.random.default_rng(seeds.quantum)
+            )
+            readout = infer_current_action(result, np.random.default_rng(seeds.network))
+        row = runs[i]
+        row["counts"] = counts_matrix([result.counts], num_qubits)[0]
+        row["probabilities"] = row["counts"] / shots
+        row["activations"] = readout.activations
+        row["threshold"] = readout.threshold
+        row["bits"] = readout.bits
+        row["action_index"] = readout.index
+
+
+def _fill(
+    name: str,
+    count: int,
+    layout: np.dtype,
+    master: np.random.SeedSequence,
+    start: int,
+    stop: int,
+    shots: int,
+) -> Filled:
+    """Compute runs ``start .. stop`` into the shared block called ``name``."""
+    # Attach without registering with this process's resource tracker, which
+    # would otherwise unlink the parent's block when the worker exits.
+    block = shared_memory.SharedMemory(name=name, track=False)
+    try:
+        # The view is gone when the call returns, so the block can close.
+        _fill_rows(
+            np.ndarray((count,), dtype=layout, buffer=block.buf),
+            master,
+            start,
+            stop,
+            shots,
+        )
+    finally:
+        block.close()
+    return Filled(start, stop)
+
+
+class SharedRuns:
+    """Runs computed into shared memory; a context manager that frees it."""
+
+    def __init__(self, count: int, layout: np.dtype):
+        """Allocate a zeroed shared array of ``count`` ``layout`` records."""
+        self._block = shared_memory.SharedMemory(
+            create=True, size=max(1, count * layout.itemsize)
+        )
+        self.runs = np.ndarray((count,), dtype=layout, buffer=self._block.buf)
+        self.runs[...] = np.zeros((), dtype=layout)
+        self._closed = False
+
+    @property
+    def name(self) -> str:
+        """Name workers attach to the block by."""
+        return self._block.name
+
+    def __len__(self) -> int:
+        """Return the number of runs."""
+        return len(self.runs)
+
+    def __enter__(self) -> SharedRuns:
+        """Return this object; the block is freed on exit.
+
+        Returns
+        -------
+        SharedRuns
+            This object.
+        """
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        tb: TracebackType | None,
+    ) -> None:
+        """Free the shared block."""
+        self.close()
+
+    def close(self) -> None:
+        """Free the shared block; closing it again does nothing.
+
+        Raises
+        ------
+        BufferError
+            If arrays viewing ``runs`` (fields, slices, ``runs`` itself) are
+            still referenced. Reading one after the block is unmapped would
+            crash the interpreter with a segfault, so the block stays mapped
+            until they are dropped; copy what must outlive it.
+        """
+        if self._closed:
+            return
+        # numpy does not hold the buffer it was built on, so the block cannot
+        # tell it is in use. Every view of the records keeps ``runs`` alive,
+        # though: beyond this attribute and getrefcount's own argument, any
+        # reference to it is a view that would dangle.
+        if (views := sys.getrefcount(self.runs) - 2) > 0:
+            raise BufferError(
+                f"{views} reference(s) to the shared runs are still in use"
+            )
+        del self.runs
+        self._block.close()
+        self._block.unlink()
+        self._closed = True
+
+
+def run_shared(
+    count: int,
+    seed: int | None = None,
+    concurrency: Concurrency | None = None,
+    chunk_size: int = DEFAULT_CHUNK,
+    shots: int = 8192,
+) -> SharedRuns:
+    """Compute ``count`` runs on a worker pool into shared memory.
+
+    Parameters
+    ----------
+    count : int
+        Number of runs
+    seed : int | None
+        Master seed; fresh OS entropy when omitted
+    concurrency : Concurrency | None
+        Pool layout, by default one worker per usable CPU. With
+        one worker the runs are computed in this process.
+    chunk_size : int
+        Runs per task handed to a worker
+    shots : int
+        Shots per run, by default 8192
+
+    Returns
+    -------
+    SharedRuns
+        The filled array; close it, or use it as a context manager, to free
+        the shared memory.
+    """
+    if concurrency is None:
+        concurrency = Concurrency.for_cpus(workers=count)
+    layout = run_dtype()
+    master = np.random.SeedSequence(seed)
+    shared = SharedRuns(count, layout)
+    tasks = [
+        (shared.name, count, layout, master, lo, min(lo + chunk_size, count), shots)
+        for lo in range(0, count, chunk_size)
+    ]
+    try:
+        if concurrency.workers == 1:
+            for task in tasks:
+                _fill_rows(shared.runs, master, *task[4:])
+        else:
+            with concurrency.executor() as pool:
+                for future in [pool.submit(_fill, *task) for task in tasks]:
+                    future.result()
+    except BaseException as exc:
+        # The traceback's frames still hold rows of the array; drop them so
+        # the block can be freed.
+        traceback.clear_frames(exc.__traceback__)
+        shared.close()
+        raise
+    return shared
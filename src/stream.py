@@ -0,0 +1,250 @@
+"""Lazily stream many runs of the pipeline with bounded memory.
+
+``main.main()`` produces one run and renders it. Offline studies want millions
+of runs (circuit -> counts -> readout) and no banners, so this module yields
+compact, columnar records in chunks instead. A background thread computes the
+next chunk while the consumer works on the current one; the hand-off queue is
+bounded, so the producer blocks when the consumer falls behind and memory stays
+flat however many runs are requested.
+
+Measurement of an ideal circuit is multinomial sampling of its Born
+distribution, so the statevector is computed once per stream and each run's
+counts are sampled from it. Run ``i`` draws everything it needs from
+``run_seeds(child(SeedSequence(seed), i))``: the counts from the quantum
+child, then the network weights, quantum noise and forward noise from the
+network child in the order ``infer_current_action`` draws them, and both turn
+them into network inputs with ``nn.network_inputs``. Any record can be
+replayed from ``(seed, i)`` alone, whatever the chunk size.
+"""
+
+from __future__ import annotations
+
+import queue
+import threading
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, cast
+
+import numpy as np
+
+from metrics import MetricArrays, distribution_metrics
+from nn import (
+    NOISE_SCALE,
+    decode_actions,
+    draw_parameters,
+    network_inputs,
+    parameter_dtype,
+)
+from quantum_circuit_qiskit import create_circuit, get_quantum_state_before_measurement
+from seeding import child, run_seeds
+from weight_bank import ensemble_forward
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+
+    from qiskit import QuantumCircuit
+
+DEFAULT_CHUNK = 4096
+
+_DONE = object()  # end-of-stream sentinel
+
+
+@dataclass(frozen=True, slots=True)
+class RunRecord:
+    """One run, reduced to what downstream aggregation needs."""
+
+    index: int
+    counts: np.ndarray  # (2**qubits,) shots per basis state, in basis order
+    activations: np.ndarray  # (outputs,) output neuron activations
+    threshold: float
+    bits: np.ndarray  # (outputs,) thresholded activations
+    action_index: int
+
+
+@dataclass(frozen=True, slots=True)
+class RunChunk:
+    """Consecutive runs ``start .. start + len(chunk)`` as columnar arrays."""
+
+    start: int
+    counts: np.ndarray  # (k, 2**qubits) int64
+    activations: np.ndarray  # (k, outputs) float64
+    thresholds: np.ndarray  # (k,) float64
+    bits: np.ndarray  # (k, outputs) uint8
+    action_indices: np.ndarray  # (k,) int64
+    metrics: MetricArrays  # distances of each run's counts from the Born rule
+
+    def __len__(self) -> int:
+        """Return the number of runs in the chunk."""
+        return len(self.counts)
+
+    def records(self) -> Iterator[RunRecord]:
+        """Split the chunk into per-run records (views, not copies).
+
+        Yields
+        ------
+        RunRecord
+            Each run of the chunk, in index order.
+        """
+        for j in range(len(self)):
+            yield RunRecord(
+                index=self.start + j,
+                counts=self.counts[j],
+                activations=self.activations[j],
+                threshold=float(self.thresholds[j]),
+                bits=self.bits[j],
+                action_index=int(self.action_indices[j]),
+            )
+
+
+def _compute_chunk(
+    master: np.random.SeedSequence,
+    start: int,
+    stop: int,
+    born: np.ndarray,
+    shots: int,
+) -> RunChunk:
+    """Sample and infer runs ``start .. stop`` of the stream."""
+    k, width = stop - start, len(born)
+    layout = parameter_dtype()
+    input_size = layout["weights_input_hidden1"].shape[0]
+    counts = np.empty((k, width), dtype=np.int64)
+    parameters = np.empty(k, dtype=layout)
+    quantum_noise = np.empty((k, width))
+    forward_noise = np.empty((k, input_size))
+
+    # Only the draws are per run; everything after them is vectorized.
+    for j in range(k):
+        seeds = run_seeds(child(master, start + j))
+        counts[j] = np.random.default_rng(seeds.quantum).multinomial(shots, born)
+        rng = np.random.default_rng(seeds.network)
+        parameters[j] = draw_parameters(rng, layout)
+        quantum_noise[j] = rng.standard_normal(width)
+        forward_noise[j] = rng.standard_normal(input_size)
+
+    inputs = network_inputs(counts / shots, quantum_noise, input_size)
+    activations = ensemble_forward(parameters, inputs, forward_noise * NOISE_SCALE)
+
+    thresholds = np.clip(activations.mean(axis=1), 0.3, 0.7)
+    bits = (activations > thresholds[:, None]).astype(np.uint8)
+    action_indices = decode_actions(bits)
+
+    return RunChunk(
+        start=start,
+        counts=counts,
+        activations=activations,
+        thresholds=thresholds,
+        bits=bits,
+        action_indices=action_indices,
+        metrics=distribution_metrics(born, counts),
+    )
+
+
+def _prefetch[T](items: Iterator[T], depth: int) -> Iterator[T]:
+    """Advance ``items`` on a background thread, at most ``depth`` items ahead.
+
+    Exceptions raised while producing are re-raised in the consumer. Closing
+    the returned generator stops the producer at its next hand-off.
+
+    Yields
+    ------
+    T
+        The items of ``items``, in order.
+    """
+    handoff: queue.Queue[object] = queue.Queue(maxsize=max(1, depth))
+    stop = threading.Event()
+
+    def put(item: object) -> bool:
+        # Time out periodically so a consumer that stopped early is noticed.
+        while not stop.is_set():
+            try:
+                handoff.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce() -> None:
+        try:
+            for item in items:
+                if not put(item):
+                    return
+            put(_DONE)
+        except BaseException as exc:  # handed to the consumer, re-raised there
+            put(exc)
+
+    producer = threading.Thread(target=produce, name="run-stream", daemon=True)
+    producer.start()
+    try:
+        while (item := handoff.get()) is not _DONE:
+            if isinstance(item, BaseException):
+                raise item
+            yield cast("T", item)
+    finally:
+        stop.set()
+        producer.join()
+
+
+def iter_run_chunks(
+    count: int,
+    seed: int | None = None,
+    chunk_size: int = DEFAULT_CHUNK,
+    prefetch: int = 1,
+    shots: int = 8192,
+    circuit: QuantumCircuit | None = None,
+) -> Iterator[RunChunk]:
+    """Stream ``count`` runs as chunks computed ahead of the consumer.
+
+    Errors raised while computing a chunk surface from this generator.
+
+    Parameters
+    ----------
+    count : int
+        Total number of runs
+    seed : int | None
+        Master seed of the stream; fresh OS entropy when omitted
+    chunk_size : int
+        Runs per chunk
+    prefetch : int
+        Finished chunks allowed to wait for the consumer. At most
+        ``prefetch + 2`` chunks exist at once: queued, in production and
+        the one being consumed.
+    shots : int
+        Shots per run, by default 8192
+    circuit : QuantumCircuit | None
+        The circuit to measure, by default the banner circuit
+
+    Yields
+    ------
+    RunChunk
+        Consecutive chunks covering runs ``0 .. count``.
+    """
+    if circuit is None:
+        circuit = create_circuit(3, 3)
+    born = get_quantum_state_before_measurement(circuit).probabilities()
+    master = np.random.SeedSequence(seed)
+
+    chunks = (
+        _compute_chunk(master, start, min(start + chunk_size, count), born, shots)
+        for start in range(0, count, chunk_size)
+    )
+    yield from _prefetch(chunks, prefetch)
+
+
+def iter_runs(count: int, seed: int | None = None, **kwargs) -> Iterator[RunRecord]:
+    """Stream ``count`` runs one record at a time.
+
+    Parameters
+    ----------
+    count : int
+        Total number of runs
+    seed : int | None
+        Master seed of the stream; fresh OS entropy when omitted
+    **kwargs
+        Passed on to ``iter_run_chunks``
+
+    Yields
+    ------
+    RunRecord
+        Runs ``0 .. count`` in order.
+    """
+    for chunk in iter_run_chunks(count, seed, **kwargs):
+        yield from chunk.records()
@@ -0,0 +1,400 @@
+"""Sharded, resumable sweeps of the banner pipeline.
+
+A sweep runs ``run_full_analysis`` and ``infer_current_action`` for every
+``(phi, seed)`` of a ``SweepSpec``. Run ``i`` is exactly what ``main.py --seed``
+would compute for that seed and angle, so any record can be replayed alone.
+The runs are cut into fixed, numbered shards, and everything lives in one
+directory that any number of processes, on one machine or many sharing the
+directory, work through together:
+
+    sweep.json                  the spec; every process must agree on it
+    shards/NNNNNN.lock          held while a process computes shard N
+    shards/NNNNNN.<sha256>.jsonl
+                                shard N's records, one ``SweepRecord`` per
+                                line, named by the hash of its contents
+    shards/NNNNNN.done          that hash; shard N is finished
+
+A shard is claimed by creating its lock with ``O_CREAT | O_EXCL``, which at
+most one process can do. The lock holds its owner's host and pid, and only
+the owner refreshes or removes it. Holders refresh the lock's mtime after
+every run, so a lock left by a crashed process goes stale and is reclaimed
+after ``stale_after`` seconds.
+
+Files are written to a temporary name and renamed into place, so a crash
+never leaves a partial file that looks finished; restarting the sweep skips
+completed shards and redoes the rest. The marker is the only thing that
+publishes a shard, and it names a records file that was complete before the
+marker existed, so even a shard computed twice (a holder too slow to refresh
+its lock, and the process that reclaimed it) always has a marker matching
+its records. Records carry no wall-clock time, the reports' timestamps being
+blank, so both computations produce the same file anyway.
+
+    python src/sweep.py runs/phi --seeds 10000 --phi 0.5 --phi 1.0 --workers 4
+    python src/sweep.py runs/phi --status
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import hashlib
+import io
+import os
+import socket
+import sys
+import tempfile
+import time
+import uuid
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+import numpy as np
+from pydantic import ValidationError
+
+from concurrency import Concurrency, configure
+from models.sweep import SweepRecord, SweepSpec
+from nn import infer_current_action
+from noise import NoiseConfig
+from quantum_circuit_qiskit import run_full_analysis
+from seeding import run_seeds
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+
+    from models.quantum import QuantumCircuitReport
+
+DEFAULT_STALE_AFTER = 15 * 60.0  # seconds without a heartbeat before reclaiming
+
+_SPEC = "sweep.json"
+
+
+def _write_atomic(path: Path, data: bytes) -> None:
+    """Write ``data`` to ``path`` so readers see all of it or none of it."""
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    with os.fdopen(fd, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+class Sweep:
+    """A sweep directory, and the work of computing its shards."""
+
+    def __init__(
+        self,
+        directory: Path,
+        spec: SweepSpec | None = None,
+        stale_after: float = DEFAULT_STALE_AFTER,
+    ):
+        """Open the sweep in ``directory``, creating it from ``spec`` if new.
+
+        Parameters
+        ----------
+        directory : Path
+            The shared sweep directory
+        spec : SweepSpec | None
+            The sweep to run. Required for a new directory; for an existing
+            one it must equal the stored spec, or be omitted to use it.
+        stale_after : float
+            Seconds after its last heartbeat that another process's lock is
+            considered abandoned
+
+        Raises
+        ------
+        ValueError
+            If ``spec`` is missing for a new sweep or differs from the stored
+            one.
+        """
+        self.directory = directory
+        self.stale_after = stale_after
+        self.shards = directory / "shards"
+        self.shards.mkdir(parents=True, exist_ok=True)
+
+        path = directory / _SPEC
+        if spec is not None and not path.exists():
+            _write_atomic(path, spec.model_dump_json(indent=2).encode())
+        try:
+            stored = SweepSpec.model_validate_json(path.read_bytes())
+        except FileNotFoundError:
+            raise ValueError(f"{directory} holds no sweep; pass a spec") from None
+        if spec is not None and spec != stored:
+            raise ValueError(f"{directory} holds a different sweep: {stored}")
+        self.spec = stored
+
+    @property
+    def run_count(self) -> int:
+        """Total number of runs in the sweep."""
+        return len(self.spec.phis) * self.spec.seed_count
+
+    @property
+    def shard_count(self) -> int:
+        """Number of shards the runs are cut into."""
+        return -(-self.run_count // self.spec.shard_size)
+
+    def _path(self, shard: int, suffix: str) -> Path:
+        return self.shards / f"{shard:06d}{suffix}"
+
+    @property
+    def _owner(self) -> str:
+        """What this process writes into the locks it holds."""
+        return f"{socket.gethostname()} {os.getpid()}\n"
+
+    def _holds(self, lock: Path) -> bool:
+        try:
+            return lock.read_text() == self._owner
+        except FileNotFoundError:
+            return False
+
+    def is_done(self, shard: int) -> bool:
+        """Tell whether ``shard``'s records are complete."""
+        return self._path(shard, ".done").exists()
+
+    def pending(self) -> list[int]:
+        """List the shards not yet finished, in order."""
+        return [k for k in range(self.shard_count) if not self.is_done(k)]
+
+    # ------------------------------------------------------------- locking --
+
+    def _claim(self, shard: int) -> bool:
+        """Try to take ``shard``'s lock, reclaiming it if abandoned."""
+        lock = self._path(shard, ".lock")
+        for _ in range(2):  # a reclaimed lock gets one more try
+            try:
+                fd = os.open(lock, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644)
+            except FileExistsError:
+                if not self._reclaim(lock):
+                    return False
+                continue
+            with os.fdopen(fd, "w") as f:
+                f.write(self._owner)
+            return True
+        return False
+
+    def _reclaim(self, lock: Path) -> bool:
+        """Remove ``lock`` if stale; return whether it may be claimed now."""
+        try:
+            if time.time() - lock.stat().st_mtime < self.stale_after:
+                return False
+        except FileNotFoundError:
+            return True  # released meanwhile
+        # Renaming is atomic, so of several processes reclaiming the same lock
+        # exactly one moves it aside; the others find it gone.
+        aside = lock.with_name(f"{lock.name}.{uuid.uuid4().hex}.stale")
+        try:
+            os.rename(lock, aside)
+        except FileNotFoundError:
+            return True
+        if time.time() - aside.stat().st_mtime < self.stale_after:
+            # Another process re-took the shard between the check and the
+            # rename; hand its lock back unless the shard was claimed again.
+            with contextlib.suppress(FileExistsError):
+                os.link(aside, lock)
+            aside.unlink()
+            return False
+        aside.unlink()
+        return True
+
+    def _release(self, shard: int) -> None:
+        # A holder too slow to refresh its lock may have lost it to another
+        # process, whose live lock must stay.
+        lock = self._path(shard, ".lock")
+        if self._holds(lock):
+            lock.unlink(missing_ok=True)
+
+    # --------------------------------------------------------------- work --
+
+    def _point(self, index: int) -> tuple[float, int]:
+        phi = self.spec.phis[index // self.spec.seed_count]
+        return phi, self.spec.first_seed + index % self.spec.seed_count
+
+    @staticmethod
+    def _untimed(report: QuantumCircuitReport) -> QuantumCircuitReport:
+        """Blank the report's wall-clock timestamp, so records are reproducible."""
+        info = report.circuit_info.model_copy(update={"timestamp": ""})
+        return report.model_copy(update={"circuit_info": info})
+
+    def _run(self, index: int) -> SweepRecord:
+        phi, seed = self._point(index)
+        seeds = run_seeds(np.random.SeedSequence(seed))
+        # run_full_analysis narrates every step; a sweep has no use for it.
+        with contextlib.redirect_stdout(io.StringIO()):
+            report, result = run_full_analysis(
+                3,
+                3,
+                np.random.default_rng(seeds.quantum),
+                shots=self.spec.shots,
+                noise=NoiseConfig() if self.spec.noise else None,
+                phi=phi,
+            )
+            readout = infer_current_action(result, np.random.default_rng(seeds.network))
+        return SweepRecord(
+            index=index,
+            phi=phi,
+            seed=seed,
+            report=self._untimed(report),
+            result=result,
+            readout=readout,
+        )
+
+    def compute_shard(self, shard: int) -> None:
+        """Compute ``shard`` and publish its records and completion marker.
+
+        The caller must hold the shard's lock; it is refreshed after each run.
+        """
+        lock = self._path(shard, ".lock")
+        start = shard * self.spec.shard_size
+        stop = min(start + self.spec.shard_size, self.run_count)
+        lines = []
+        for index in range(start, stop):
+            lines.append(self._run(index).model_dump_json())
+            if self._holds(lock):
+                with contextlib.suppress(FileNotFoundError):
+                    os.utime(lock)  # heartbeat
+        data = "".join(f"{line}\n" for line in lines).encode()
+        digest = hashlib.sha256(data).hexdigest()
+        # The records go under their own hash first; the marker then publishes
+        # them in one rename, so it can only ever name complete records.
+        _write_atomic(self._path(shard, f".{digest}.jsonl"), data)
+        _write_atomic(self._path(shard, ".done"), digest.encode())
+
+    def run(self) -> int:
+        """Compute shards until none is left unclaimed.
+
+        Returns
+        -------
+        int
+            Number of shards this call computed.
+        """
+        computed = 0
+        for shard in self.pending():
+            if not self._claim(shard):
+                continue
+            try:
+                if self.is_done(shard):  # finished between the scan and the claim
+                    continue
+                began = time.perf_counter()
+                self.compute_shard(shard)
+                computed += 1
+                print(
+                    f"✅ Shard {shard + 1}/{self.shard_count}"
+                    f" in {time.perf_counter() - began:.1f}s"
+                )
+            finally:
+                self._release(shard)
+        return computed
+
+    # -------------------------------------------------------------- results --
+
+    def records(self) -> Iterator[SweepRecord]:
+        """Read the records of every finished shard, in run order.
+
+        Yields
+        ------
+        SweepRecord
+            Each completed run.
+
+        Raises
+        ------
+        ValueError
+            If a shard's records do not match its completion marker.
+        """
+        for shard in range(self.shard_count):
+            if not self.is_done(shard):
+                continue
+            expected = self._path(shard, ".done").read_text().strip()
+            data = self._path(shard, f".{expected}.jsonl").read_bytes()
+            if hashlib.sha256(data).hexdigest() != expected:
+                raise ValueError(f"shard {shard} does not match its marker")
+            for line in data.splitlines():
+                yield SweepRecord.model_validate_json(line)
+
+
+def _work(directory: Path, stale_after: float) -> int:
+    return Sweep(directory, stale_after=stale_after).run()
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("directory", type=Path, help="shared sweep directory")
+    # The run flags default to None so that, when resuming, the ones actually
+    # given can be checked against the stored spec; SweepSpec holds defaults.
+    parser.add_argument(
+        "--seeds", type=int, help="number of seeds per angle (new sweeps only)"
+    )
+    parser.add_argument("--first-seed", type=int, help="default 0")
+    parser.add_argument(
+        "--phi",
+        type=float,
+        action="append",
+        help="ry angle to sweep; repeat for several (default π/3)",
+    )
+    parser.add_argument("--shots", type=int, help="default 8192")
+    parser.add_argument("--noise", action="store_true", default=None)
+    parser.add_argument("--shard-size", type=int, help="default 16")
+    parser.add_argument("--workers", type=int, default=1, help="local processes to run")
+    parser.add_argument(
+        "--stale-after",
+        type=float,
+        default=DEFAULT_STALE_AFTER,
+        metavar="SECONDS",
+        help="reclaim locks not refreshed for this long",
+    )
+    parser.add_argument(
+        "--status", action="store_true", help="report progress and exit"
+    )
+    return parser.parse_args()
+
+
+def _spec_flags(args: argparse.Namespace) -> dict[str, Any]:
+    """Collect the ``SweepSpec`` fields given on the command line."""
+    flags = {
+        "phis": args.phi,
+        "first_seed": args.first_seed,
+        "seed_count": args.seeds,
+        "shots": args.shots,
+        "noise": args.noise,
+        "shard_size": args.shard_size,
+    }
+    return {field: value for field, value in flags.items() if value is not None}
+
+
+def main() -> int:
+    args = _parse_args()
+    flags = _spec_flags(args)
+    try:
+        spec = SweepSpec.model_validate(flags) if args.seeds is not None else None
+        sweep = Sweep(args.directory, spec, args.stale_after)
+        # Resuming without --seeds: any run flag given must match the stored
+        # spec rather than be silently ignored.
+        stored = sweep.spec
+        if SweepSpec.model_validate({**stored.model_dump(), **flags}) != stored:
+            raise ValueError(
+                f"{args.directory} holds a different sweep: {stored}; "
+                "omit the run flags to resume it"
+            )
+    except (ValueError, ValidationError) as exc:
+        print(f"❌ {exc}", file=sys.stderr)
+        return 2
+
+    if not args.status:
+        concurrency = Concurrency.for_cpus(workers=args.workers)
+        if concurrency.workers == 1:
+            configure(concurrency)
+            sweep.run()
+        else:
+            with concurrency.executor() as pool:
+                futures = [
+                    pool.submit(_work, args.directory, args.stale_after)
+                    for _ in range(concurrency.workers)
+                ]
+                for future in futures:
+                    future.result()
+
+    remaining = len(sweep.pending())
+    print(f"📦 {sweep.shard_count - remaining}/{sweep.shard_count} shards done")
+    return 1 if remaining else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
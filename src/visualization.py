@@ -10,14 +10,24 @@ matching the reader's GitHub theme.
 from __future__ import annotations
 
 import base64
+import functools
+import numbers
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Any
+from typing import TYPE_CHECKING, Any, NamedTuple
 
-from jinja2 import Environment, FileSystemLoader, StrictUndefined
+from jinja2 import Environment, FileSystemLoader, StrictUndefined, Template
+from qiskit.circuit import ControlledGate, ParameterExpression
+from qiskit.circuit.tools import pi_check
 
+from minify import DEFAULT_PRECISION, minify_svg, write_compressed
+from profiling import stage
 from theme import PALETTES, Palette
 
+if TYPE_CHECKING:
+    from qiskit import QuantumCircuit
+    from qiskit.circuit import CircuitInstruction, Qubit
+
 ROOT = Path(__file__).resolve().parent.parent
 FONT_DIR = ROOT / "assets" / "fonts"
 OUT_DIR = ROOT / "assets"
@@ -43,10 +53,12 @@ ZONE_A = (2, 286)
 ZONE_B = (314, 592)
 ZONE_C = (624, 878)
 
-# PREPARE — three qubit wires and the six gate columns of the circuit
+# PREPARE — one wire per qubit; the circuit's gates packed into columns
 WIRE_X0, WIRE_X1 = 26, 280  # wires stop at the measurement gate
-ROWS_A = (109, 141, 173)
-GATE_CX = (78, 116, 154, 192, 230, 268)
+GATE_X0, GATE_X1 = 78, 268  # centres of the first and last column
+GATE_PITCH = 38  # column spacing at full size; more columns squeeze together
+ROW_PITCH = 32  # wire spacing at full size
+ROW_SPAN = 88  # most height the wires may take, centred on FLOW_Y
 GATE_W, GATE_H = 24, 22
 
 # MEASURE — one row per computational basis state.
@@ -67,51 +79,13 @@ METER_X, METER_W, METER_H = 650, 120, 6
 VALUE_X = 808
 BIT_X = 876  # right-aligns with the rules and the header timestamp
 
-# The circuit from quantum_circuit_qiskit.create_circuit, as drawing
-# instructions. Controls are filled dots, targets are the XOR symbol.
-
-
-@dataclass(frozen=True)
-class BoxGate:
-    """A single-qubit gate drawn as a labelled box."""
-
-    row: int
-    label: str
-    note: str | None = None
-
-
-@dataclass(frozen=True)
-class MultiGate:
-    """An entangling gate: filled control dots joined to an XOR target."""
-
-    controls: tuple[int, ...]
-    target: int
-
-
-@dataclass(frozen=True)
-class MeasureGate:
-    """The measurement column, where the circuit hands off to the histogram."""
-
-    rows: tuple[int, ...]
-
-
-Gate = BoxGate | MultiGate | MeasureGate
-
-CIRCUIT: tuple[Gate, ...] = (
-    BoxGate(row=0, label="H"),
-    MultiGate(controls=(0,), target=1),
-    BoxGate(row=1, label="H"),
-    BoxGate(row=2, label="Ry", note="π/3"),
-    MultiGate(controls=(0, 1), target=2),
-    MeasureGate(rows=(0, 1, 2)),
-)
-
 
 @dataclass(frozen=True)
 class BannerData:
     """Everything the banner displays, all of it measured this run."""
 
     timestamp: str
+    circuit: QuantumCircuit
     qubits: int
     depth: int
     gate_count: int
@@ -126,50 +100,69 @@ class BannerData:
     action: str
 
 
-# Positioned counterparts of the gates above. The template branches on `kind`
-# and reads these attributes directly, so every coordinate it needs is resolved
-# here rather than computed in Jinja.
+# Positioned gates. The template branches on `kind` and reads these attributes
+# directly, so every coordinate and size it needs is resolved here rather than
+# computed in Jinja.
 
 
 @dataclass(frozen=True)
 class BoxColumn:
+    """A gate drawn as a labelled box, spanning every wire it acts on."""
+
     cx: float
     x: float
     y: float
+    w: float
+    h: float
     text_y: float
     label: str
-    note: str | None
+    font_size: str
+    note: str | None  # the angles of this column's gates, under the last wire
     note_y: float
+    note_size: str
     kind: str = "box"
 
 
 @dataclass(frozen=True)
 class MultiColumn:
+    """A controlled-X: filled control dots joined to an XOR target."""
+
     cx: float
     controls_y: tuple[float, ...]
     target_y: float
     y0: float
     y1: float
+    dot_r: float
+    target_r: float
     kind: str = "multi"
 
 
 @dataclass(frozen=True)
-class MeasureBox:
+class MeasureColumn:
+    """A measurement, where the circuit hands off to the histogram."""
+
+    cx: float
     x: float
     y: float
+    w: float
+    h: float
     text_y: float
-
-
-@dataclass(frozen=True)
-class MeasureColumn:
-    cx: float
-    boxes: tuple[MeasureBox, ...]
+    font_size: str
     kind: str = "measure"
 
 
 Column = BoxColumn | MultiColumn | MeasureColumn
 
 
+@dataclass(frozen=True)
+class CircuitLayout:
+    """The PREPARE panel: one height per wire and the positioned gates."""
+
+    rows: tuple[float, ...]
+    columns: tuple[Column, ...]
+    wire_font_size: str | None  # None keeps the banner's own size
+
+
 @dataclass(frozen=True)
 class HistogramRow:
     """One measured basis state: label, bar geometry and formatted percentage."""
@@ -205,49 +198,199 @@ def _font_face(weight: int) -> str:
     )
 
 
-def _circuit_columns() -> list[Column]:
-    """Resolve the circuit description into positioned drawing instructions."""
-    columns: list[Column] = []
-    for cx, gate in zip(GATE_CX, CIRCUIT, strict=True):
-        if isinstance(gate, BoxGate):
-            row_y = ROWS_A[gate.row]
-            columns.append(
-                BoxColumn(
-                    cx=cx,
-                    x=cx - GATE_W / 2,
-                    y=row_y - GATE_H / 2,
-                    text_y=row_y + 4,
-                    label=gate.label,
-                    note=gate.note,
-                    note_y=ROWS_A[-1] + 22,
-                )
-            )
-        elif isinstance(gate, MultiGate):
-            ys = [ROWS_A[i] for i in (*gate.controls, gate.target)]
-            columns.append(
-                MultiColumn(
-                    cx=cx,
-                    controls_y=tuple(ROWS_A[i] for i in gate.controls),
-                    target_y=ROWS_A[gate.target],
-                    y0=min(ys),
-                    y1=max(ys),
-                )
-            )
-        else:
-            columns.append(
-                MeasureColumn(
-                    cx=cx,
-                    boxes=tuple(
-                        MeasureBox(
-                            x=cx - GATE_W / 2,
-                            y=ROWS_A[i] - GATE_H / 2,
-                            text_y=ROWS_A[i] + 4,
-                        )
-                        for i in gate.rows
-                    ),
+# Box labels that are not just the gate's name, capitalized
+_LABELS = {
+    "sdg": "S†",
+    "tdg": "T†",
+    "sx": "√X",
+    "sxdg": "√X†",
+    "swap": "SWAP",
+    "iswap": "iSWAP",
+    "cswap": "CSWAP",
+    "reset": "|0⟩",
+    "id": "I",
+}
+
+
+class _Op(NamedTuple):
+    """An instruction reduced to what its drawing depends on; hashable."""
+
+    name: str
+    qubits: tuple[int, ...]
+    angles: tuple[float | str, ...]  # numeric or symbolic parameters
+    controls: int  # leading control qubits of a controlled-X, else 0
+
+
+def _angle(value: object) -> float | str | None:
+    if isinstance(value, ParameterExpression):
+        return str(value) if value.parameters else float(value)
+    if isinstance(value, numbers.Real):
+        return float(value)
+    return None  # e.g. a unitary's matrix, which has no short label
+
+
+def _op(instruction: CircuitInstruction, index: dict[Qubit, int]) -> _Op:
+    operation = instruction.operation
+    controls = 0
+    if (
+        isinstance(operation, ControlledGate)
+        and operation.base_gate.name == "x"
+        and operation.ctrl_state == 2**operation.num_ctrl_qubits - 1
+    ):
+        controls = operation.num_ctrl_qubits
+    angles = (_angle(value) for value in operation.params)
+    return _Op(
+        operation.name,
+        tuple(index[q] for q in instruction.qubits),
+        tuple(a for a in angles if a is not None),
+        controls,
+    )
+
+
+def _label(name: str) -> str:
+    if name in _LABELS:
+        return _LABELS[name]
+    if name.startswith("r") and len(name) <= 3:
+        return "R" + name[1:]  # rx, ry, rzz, ...
+    return name.upper() if len(name) <= 2 else name.capitalize()[:5]
+
+
+def _size(points: float, scale: float) -> str:
+    return f"{points * scale:.3g}"
+
+
+def _pack(ops: tuple[_Op, ...], num_qubits: int) -> list[int]:
+    """Give each op the earliest column its wires allow; barriers get -1."""
+    # ``free[q]`` is the first column wire ``q`` has room in. A gate's vertical
+    # line crosses every wire between its outer qubits, so it occupies those
+    # too; a barrier holds its wires back to the latest of them. Each op
+    # touches only its own span, so packing is linear in the gate count.
+    free = [0] * num_qubits
+    placed = []
+    for op in ops:
+        if not op.qubits:
+            placed.append(-1)
+            continue
+        if op.name == "barrier":
+            sync = max(free[q] for q in op.qubits)
+            for q in op.qubits:
+                free[q] = sync
+            placed.append(-1)
+            continue
+        span = range(min(op.qubits), max(op.qubits) + 1)
+        column = max(free[q] for q in span)
+        for q in span:
+            free[q] = column + 1
+        placed.append(column)
+    return placed
+
+
+def _notes(ops: tuple[_Op, ...], placed: list[int]) -> dict[int, str]:
+    """Join the angles of each column's gates into that column's note."""
+    notes: dict[int, list[str]] = {}
+    for op, column in zip(ops, placed, strict=True):
+        if column >= 0 and op.angles and op.name != "measure":
+            notes.setdefault(column, []).append(
+                ",".join(
+                    a if isinstance(a, str) else pi_check(a, output="text", ndigits=3)
+                    for a in op.angles
                 )
             )
-    return columns
+    return {column: " ".join(texts) for column, texts in notes.items()}
+
+
+def _column(
+    op: _Op, cx: float, rows: tuple[float, ...], scale: float, note: str | None
+) -> Column:
+    """Position one gate in its column."""
+    w, h = GATE_W * scale, GATE_H * scale
+    if op.name == "measure":
+        y = rows[op.qubits[0]]
+        return MeasureColumn(
+            cx=cx,
+            x=cx - w / 2,
+            y=y - h / 2,
+            w=w,
+            h=h,
+            text_y=y + 4 * scale,
+            font_size=_size(11, scale),
+        )
+    if op.controls:
+        ys = [rows[q] for q in op.qubits]
+        return MultiColumn(
+            cx=cx,
+            controls_y=tuple(ys[: op.controls]),
+            target_y=ys[-1],
+            y0=min(ys),
+            y1=max(ys),
+            dot_r=3.6 * scale,
+            target_r=7 * scale,
+        )
+    top, bottom = rows[min(op.qubits)], rows[max(op.qubits)]
+    label = _label(op.name)
+    font = 11 if len(label) == 1 else 9.5
+    # Source Code Pro advances 0.6em per glyph; wide labels widen the box.
+    w = max(w, (0.6 * font * len(label) + 6) * scale)
+    return BoxColumn(
+        cx=cx,
+        x=cx - w / 2,
+        y=top - h / 2,
+        w=w,
+        h=bottom - top + h,
+        text_y=(top + bottom) / 2 + 4 * scale,
+        label=label,
+        font_size=_size(font, scale),
+        note=note,
+        note_y=rows[-1] + 22 * scale,
+        note_size=_size(8.5, scale),
+    )
+
+
+@functools.lru_cache(maxsize=64)
+def _layout(ops: tuple[_Op, ...], num_qubits: int) -> CircuitLayout:
+    placed = _pack(ops, num_qubits)
+    count = max(placed, default=-1) + 1
+    pitch = min(GATE_PITCH, (GATE_X1 - GATE_X0) / max(1, count - 1))
+    step = min(ROW_PITCH, ROW_SPAN / max(1, num_qubits - 1))
+    scale = min(pitch / GATE_PITCH, step / ROW_PITCH)
+
+    # Columns are right-aligned so the measurements sit where the wires end.
+    top = FLOW_Y - step * (num_qubits - 1) / 2
+    rows = tuple(top + i * step for i in range(num_qubits))
+    notes = _notes(ops, placed)
+    columns = []
+    for op, column in zip(ops, placed, strict=True):
+        if column >= 0:
+            cx = GATE_X1 - (count - 1 - column) * pitch
+            columns.append(_column(op, cx, rows, scale, notes.pop(column, None)))
+    return CircuitLayout(
+        rows=rows,
+        columns=tuple(columns),
+        wire_font_size=None if step >= ROW_PITCH else _size(10, step / ROW_PITCH),
+    )
+
+
+def circuit_layout(circuit: QuantumCircuit) -> CircuitLayout:
+    """Lay out ``circuit`` for the PREPARE panel.
+
+    Gates are packed greedily into the earliest column free on every wire they
+    span, with barriers as synchronization points, and the panel shrinks its
+    columns and rows to fit wider and taller circuits.
+
+    Parameters
+    ----------
+    circuit : QuantumCircuit
+        The circuit to draw; parameters may be bound or symbolic
+
+    Returns
+    -------
+    CircuitLayout
+        Wire heights and positioned gates. Layouts are cached by the
+        circuit's content, so redrawing an unchanged circuit is a lookup.
+    """
+    index = {q: i for i, q in enumerate(circuit.qubits)}
+    ops = tuple(_op(instruction, index) for instruction in circuit.data)
+    return _layout(ops, circuit.num_qubits)
 
 
 def _histogram(data: BannerData) -> list[HistogramRow]:
@@ -291,7 +434,19 @@ def _neurons(data: BannerData) -> list[NeuronRow]:
     return rows
 
 
-def _context(data: BannerData, palette: Palette) -> dict[str, Any]:
+@stage
+def load_fonts() -> str:
+    """Read the embedded fonts as ``@font-face`` rules, shared by every palette."""
+    return _font_face(400) + _font_face(600)
+
+
+@stage
+def load_template() -> Template:
+    """Load and compile the banner template."""
+    return env.get_template("banner.svg.jinja")
+
+
+def _context(data: BannerData, palette: Palette, fonts: str) -> dict[str, Any]:
     return {
         "c": palette,
         "w": W,
@@ -306,14 +461,11 @@ def _context(data: BannerData, palette: Palette) -> dict[str, Any]:
         "zone_a": ZONE_A,
         "zone_b": ZONE_B,
         "zone_c": ZONE_C,
-        "font_faces": _font_face(400) + _font_face(600),
+        "font_faces": fonts,
         # PREPARE
         "wire_x0": WIRE_X0,
         "wire_x1": WIRE_X1,
-        "rows_a": ROWS_A,
-        "gate_w": GATE_W,
-        "gate_h": GATE_H,
-        "columns": _circuit_columns(),
+        "prepare": circuit_layout(data.circuit),
         # MEASURE
         "ket_digits_x": KET_DIGITS_X,
         "bar_x": BAR_X,
@@ -343,14 +495,47 @@ def _context(data: BannerData, palette: Palette) -> dict[str, Any]:
     }
 
 
-def create_banner(data: BannerData) -> list[Path]:
-    """Write one banner SVG per palette. Returns the paths written."""
-    template = env.get_template("banner.svg.jinja")
+@stage
+def create_banner(
+    data: BannerData,
+    template: Template | None = None,
+    fonts: str | None = None,
+    precision: int | None = DEFAULT_PRECISION,
+    compress: bool = False,
+) -> list[Path]:
+    """Write one banner SVG per palette.
+
+    Parameters
+    ----------
+    data : BannerData
+        What the banner shows
+    template : Template | None
+        The compiled template, by default ``load_template()``
+    fonts : str | None
+        The ``@font-face`` rules, by default ``load_fonts()``
+    precision : int | None
+        Decimal places kept when minifying; None writes the template output
+        as rendered
+    compress : bool
+        Also write precompressed ``.svg.gz`` (and ``.svg.br``) siblings
+
+    Returns
+    -------
+    list[Path]
+        The paths written, compressed siblings included.
+    """
+    template = load_template() if template is None else template
+    fonts = load_fonts() if fonts is None else fonts
     OUT_DIR.mkdir(parents=True, exist_ok=True)
 
     written = []
     for palette in PALETTES:
         path = OUT_DIR / f"banner-{palette.name}.svg"
-        path.write_text(template.render(**_context(data, palette)), encoding="utf-8")
+        svg = template.render(**_context(data, palette, fonts))
+        if precision is not None:
+            svg = minify_svg(svg, precision)
+        path.write_text(svg, encoding="utf-8")
         written.append(path)
+        if compress:
+            written.extend(write_compressed(path))
     return written
@@ -0,0 +1,193 @@
+"""A pre-generated, memory-mapped bank of network parameter sets.
+
+Inference normally draws a fresh ``SimpleNeuralNetwork`` per run. Ensemble and
+replay workloads instead want a fixed population: network ``i`` should be the
+same network every time it is evaluated, and the population may be far larger
+than RAM.
+
+A bank is a ``.npy`` file holding a 1-d array of ``parameter_dtype`` records,
+one per network, stored contiguously. ``.npy`` keeps the record layout in its
+header, so a bank is self-describing and opens as an ``np.memmap``: selecting
+or streaming networks by index only pages in the records actually touched.
+
+Network ``i`` of a bank built from ``seed`` has exactly the weights of
+``SimpleNeuralNetwork(rng=np.random.default_rng(child(SeedSequence(seed), i)))``,
+so any entry can be regenerated, or checked, without the file.
+"""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+from nn import SimpleNeuralNetwork, draw_parameters, parameter_dtype
+from seeding import child
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+    from pathlib import Path
+
+    from numpy.typing import DTypeLike
+
+DEFAULT_CHUNK = 65536  # networks per generation or streaming step
+
+
+def create_weight_bank(
+    path: Path,
+    count: int,
+    seed: int,
+    dtype: DTypeLike = np.float64,
+    chunk_size: int = DEFAULT_CHUNK,
+) -> WeightBank:
+    """Generate ``count`` networks from ``seed`` and write them to ``path``.
+
+    Parameters
+    ----------
+    path : Path
+        Where the ``.npy`` bank is written
+    count : int
+        Number of networks in the bank
+    seed : int
+        Master seed; network ``i`` is drawn from its ``i``-th child
+    dtype : DTypeLike
+        Floating dtype the parameters are stored in, by default float64.
+        float32 halves the file and the bandwidth of every scan.
+    chunk_size : int
+        Networks generated between flushes, which bounds memory use
+
+    Returns
+    -------
+    WeightBank
+        The new bank, opened read-only.
+    """
+    layout = parameter_dtype(dtype=dtype)
+    draw_layout = parameter_dtype()
+    master = np.random.SeedSequence(seed)
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    bank = np.lib.format.open_memmap(path, mode="w+", dtype=layout, shape=(count,))
+    for start in range(0, count, chunk_size):
+        stop = min(start + chunk_size, count)
+        for i in range(start, stop):
+            rng = np.random.default_rng(child(master, i))
+            bank[i] = draw_parameters(rng, draw_layout)
+        bank.flush()
+    del bank
+    return WeightBank(path)
+
+
+class WeightBank:
+    """Read-only view of a weight bank file."""
+
+    def __init__(self, path: Path):
+        """Map the bank at ``path`` without reading it into memory.
+
+        Parameters
+        ----------
+        path : Path
+            A bank written by ``create_weight_bank``
+        """
+        self.path = path
+        self.parameters: np.ndarray = np.lib.format.open_memmap(path, mode="r")
+
+    def __len__(self) -> int:
+        """Return the number of networks in the bank."""
+        return len(self.parameters)
+
+    def __getitem__(self, index: int | slice | np.ndarray) -> np.ndarray:
+        """Return the parameter records at ``index``, as a view where possible."""
+        return self.parameters[index]
+
+    def network(
+        self,
+        index: int,
+        rng: np.random.Generator | None = None,
+        dtype: DTypeLike = np.float64,
+        quantize: bool = False,
+    ) -> SimpleNeuralNetwork:
+        """Build network ``index`` for per-run inference.
+
+        Parameters
+        ----------
+        index : int
+            Which network to build
+        rng : np.random.Generator | None
+            Source of the forward-pass noise
+        dtype : DTypeLike
+            Floating dtype to run the network in, by default float64
+        quantize : bool
+            Quantize its weights to int8, by default False
+
+        Returns
+        -------
+        SimpleNeuralNetwork
+            The network holding bank entry ``index``.
+        """
+        return SimpleNeuralNetwork(
+            rng=rng, dtype=dtype, quantize=quantize, parameters=self.parameters[index]
+        )
+
+    def chunks(
+        self, start: int = 0, stop: int | None = None, chunk_size: int = DEFAULT_CHUNK
+    ) -> Iterator[tuple[int, np.ndarray]]:
+        """Stream the bank in contiguous slices.
+
+        Parameters
+        ----------
+        start : int
+            First network index, by default 0
+        stop : int | None
+            One past the last network index, by default the end of the bank
+        chunk_size : int
+            Networks per slice
+
+        Yields
+        ------
+        tuple[int, np.ndarray]
+            The index of the slice's first network and the slice itself, a
+            view into the mapped file.
+        """
+        stop = len(self) if stop is None else min(stop, len(self))
+        for lo in range(start, stop, chunk_size):
+            yield lo, self.parameters[lo : min(lo + chunk_size, stop)]
+
+
+def ensemble_forward(
+    parameters: np.ndarray, inputs: np.ndarray, noise: np.ndarray | None = None
+) -> np.ndarray:
+    """Forward pass of many networks at once.
+
+    Computes what ``SimpleNeuralNetwork.forward`` does, for every record in
+    ``parameters`` in one batched matmul per layer, in the records' own dtype.
+
+    Parameters
+    ----------
+    parameters : np.ndarray
+        (k,) array of ``parameter_dtype`` records, e.g. a ``WeightBank`` slice
+    inputs : np.ndarray
+        One input vector shared by all k networks, or a (k, n) array with one
+        input per network
+    noise : np.ndarray | None
+        (k, n) noise added to the scaled inputs, as ``forward`` adds its own
+        draws when ``add_noise`` is set. Noise-free when omitted.
+
+    Returns
+    -------
+    np.ndarray
+        (k, output_size) activations.
+    """
+    dtype = parameters.dtype["bias_output"].base
+    x = np.broadcast_to(inputs, (len(parameters), inputs.shape[-1]))
+    x = x.astype(dtype) * dtype.type(8.0)
+    if noise is not None:
+        x = x + noise.astype(dtype)
+    x = x[:, None, :]
+
+    hidden1 = x @ parameters["weights_input_hidden1"]
+    hidden1 = np.tanh(hidden1 + parameters["bias_hidden1"][:, None, :])
+    hidden2 = hidden1 @ parameters["weights_hidden1_hidden2"]
+    hidden2 = np.maximum(0, hidden2 + parameters["bias_hidden2"][:, None, :])
+    output = hidden2 @ parameters["weights_hidden2_output"]
+    output += parameters["bias_output"][:, None, :]
+    return (0.5 * (1 + np.tanh(0.5 * output)))[:, 0, :]
@@ -0,0 +1,23 @@
+"""Shared fixtures: one seeded run of the pipeline, computed once."""
+
+import contextlib
+import io
+
+import numpy as np
+import pytest
+
+from nn import infer_current_action
+from quantum_circuit_qiskit import run_full_analysis
+from seeding import run_seeds
+
+
+@pytest.fixture(scope="session")
+def run():
+    """Report, result and readout of the banner run for seed 7."""
+    seeds = run_seeds(np.random.SeedSequence(7))
+    with contextlib.redirect_stdout(io.StringIO()):  # the stages narrate
+        report, result = run_full_analysis(
+            3, 3, np.random.default_rng(seeds.quantum), shots=1024
+        )
+        readout = infer_current_action(result, np.random.default_rng(seeds.network))
+    return report, result, readout
@@ -0,0 +1,37 @@
+"""Output bits decode to actions through a uniform table."""
+
+import numpy as np
+import pytest
+
+from constants import STATE_LIST
+from nn import SimpleNeuralNetwork, action_table, decode_actions
+
+
+def test_four_bits_map_one_to_one():
+    assert np.array_equal(action_table(4), np.arange(len(STATE_LIST)))
+
+
+@pytest.mark.parametrize("bits", [5, 6, 7])
+def test_patterns_split_evenly_and_contiguously(bits):
+    table = action_table(bits)
+    sizes = np.bincount(table, minlength=len(STATE_LIST))
+    assert sizes.max() - sizes.min() <= 1
+    assert np.all(np.diff(table) >= 0)
+
+
+def test_too_few_bits_are_rejected():
+    with pytest.raises(ValueError, match="patterns"):
+        action_table(3)
+
+
+def test_table_is_read_only():
+    with pytest.raises(ValueError):
+        action_table(4)[0] = 1
+
+
+def test_bit_zero_is_most_significant():
+    bits = np.array([[1, 0, 0, 1], [0, 0, 0, 0], [1, 1, 1, 1]])
+    assert decode_actions(bits).tolist() == [9, 0, 15]
+    assert decode_actions(np.array([1, 1, 1, 1, 1])) == 15
+    network = SimpleNeuralNetwork(rng=np.random.default_rng(0))
+    assert network.bits_to_action_index(np.array([0, 1, 1, 0])) == 6
@@ -0,0 +1,38 @@
+"""The result cache stays within its bound and never leaves partial files."""
+
+import os
+
+import pytest
+
+from cache import ResultCache
+from models.nn import NeuralReadout
+
+READOUT = NeuralReadout(
+    activations=[0.1, 0.9, 0.2, 0.8],
+    threshold=0.5,
+    bits=[0, 1, 0, 1],
+    index=5,
+    action="Debugging",
+)
+SIZE = len(READOUT.model_dump_json().encode())
+
+
+def test_evicts_least_recently_used(tmp_path):
+    cache = ResultCache(tmp_path, max_bytes=3 * SIZE)
+    for i in range(3):
+        cache.put("readout", f"k{i}", READOUT)
+        os.utime(tmp_path / "readout" / f"k{i}.json", (i, i))
+    assert cache.get("readout", "k0", NeuralReadout) == READOUT  # now most recent
+
+    cache.put("readout", "k3", READOUT)
+    assert sorted(p.stem for p in tmp_path.glob("*/*.json")) == ["k0", "k2", "k3"]
+
+
+def test_failed_write_leaves_no_temporary_file(tmp_path, monkeypatch):
+    def fail(*_):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(os, "replace", fail)
+    with pytest.raises(OSError, match="disk full"):
+        ResultCache(tmp_path).put("readout", "k", READOUT)
+    assert list(tmp_path.rglob("*.tmp")) == []
@@ -0,0 +1,35 @@
+"""Exported runs read back unchanged, and placeholders are refused."""
+
+import numpy as np
+import pytest
+
+from export import ResultFile, save_results
+
+
+def test_round_trip(run, tmp_path):
+    report, result, readout = run
+    path = tmp_path / "run.qres"
+    size = save_results(path, report=report, result=result, readout=readout)
+    assert size == path.stat().st_size
+
+    saved = ResultFile(path)
+    assert saved.result() == result
+    assert saved.readout() == readout
+    loaded = saved.report()
+    assert np.array_equal(
+        loaded.quantum_properties.quantum_state_vector.data,
+        report.quantum_properties.quantum_state_vector.data,
+    )
+    assert loaded.model_dump(mode="json") == report.model_dump(mode="json")
+
+
+def test_placeholder_statevector_is_refused(run, tmp_path):
+    report, _, _ = run
+    # What a report read back from JSON (e.g. the result cache) holds
+    cached = type(report).model_validate_json(report.model_dump_json())
+    assert isinstance(cached.quantum_properties.quantum_state_vector, str)
+
+    path = tmp_path / "run.qres"
+    with pytest.raises(ValueError, match="statevector"):
+        save_results(path, report=cached)
+    assert not path.exists()
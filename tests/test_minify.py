@@ -0,0 +1,58 @@
+"""Minified banners stay well-formed SVG with the same elements and text."""
+
+import xml.etree.ElementTree as ET
+from collections import Counter
+
+import pytest
+
+import visualization
+from constants import STATE_LIST
+from minify import minify_svg
+from quantum_circuit_qiskit import create_circuit
+from visualization import BannerData, create_banner
+
+SVG = "{http://www.w3.org/2000/svg}"
+
+
+@pytest.fixture(scope="module")
+def rendered(run, tmp_path_factory):
+    """Each palette's banner as the template renders it."""
+    report, result, readout = run
+    data = BannerData(
+        timestamp="01 JAN 2026 · 00:00 UTC",
+        circuit=create_circuit(3, 3),
+        qubits=3,
+        depth=report.circuit_info.depth,
+        gate_count=sum(
+            n
+            for gate, n in report.circuit_info.gates.items()
+            if gate not in ("barrier", "measure")
+        ),
+        distribution=sorted(result.probabilities.items(), key=lambda kv: -kv[1]),
+        shots=sum(result.counts.values()),
+        entropy=result.entropy,
+        activations=readout.activations,
+        threshold=readout.threshold,
+        bits=readout.bits,
+        index=readout.index,
+        action_count=len(STATE_LIST),
+        action=readout.action,
+    )
+    with pytest.MonkeyPatch.context() as patch:
+        patch.setattr(visualization, "OUT_DIR", tmp_path_factory.mktemp("banners"))
+        paths = create_banner(data, precision=None)
+    return [path.read_text(encoding="utf-8") for path in paths]
+
+
+def _content(root: ET.Element) -> tuple[Counter[str], list[str]]:
+    """Element counts by tag, except the added stylesheet, and text runs."""
+    tags = Counter(e.tag for e in root.iter() if e.tag != f"{SVG}style")
+    texts = [" ".join("".join(e.itertext()).split()) for e in root.iter(f"{SVG}text")]
+    return tags, texts
+
+
+def test_minified_banner_parses_and_keeps_content(rendered):
+    for svg in rendered:
+        minified = minify_svg(svg)
+        assert len(minified) < len(svg)
+        assert _content(ET.fromstring(minified)) == _content(ET.fromstring(svg))
@@ -0,0 +1,71 @@
+"""Reduced-precision inference stays within fixed bounds of float64."""
+
+import contextlib
+import io
+
+import numpy as np
+import pytest
+
+from nn import SimpleNeuralNetwork
+
+SEEDS = range(50)
+INPUTS = np.random.default_rng(2024).dirichlet(np.ones(8), size=100)
+
+
+def _outputs(seed: int, **precision) -> tuple[np.ndarray, np.ndarray]:
+    """Activations and ``predict_bits`` bits for every input in INPUTS."""
+    # Noise is drawn in float64 whatever the precision, so networks built from
+    # the same seed add identical noise and only their arithmetic differs.
+    network = SimpleNeuralNetwork(rng=np.random.default_rng(seed), **precision)
+    with contextlib.redirect_stdout(io.StringIO()):
+        activations, _, bits = network.predict_bits(INPUTS)
+    return activations.astype(np.float64), bits
+
+
+@pytest.fixture(scope="module")
+def reference() -> list[tuple[np.ndarray, np.ndarray]]:
+    return [_outputs(seed) for seed in SEEDS]
+
+
+def test_float32_drift(reference):
+    for seed, (activations, bits) in zip(SEEDS, reference, strict=True):
+        low, low_bits = _outputs(seed, dtype=np.float32)
+        assert np.abs(low - activations).max() < 1e-5
+        assert np.array_equal(low_bits, bits)
+
+
+def test_int8_drift(reference):
+    flipped = 0
+    for seed, (activations, bits) in zip(SEEDS, reference, strict=True):
+        low, low_bits = _outputs(seed, quantize=True)
+        assert np.abs(low - activations).max() < 0.1
+        flipped += np.count_nonzero((low_bits != bits).any(axis=1))
+    assert flipped / (len(SEEDS) * len(INPUTS)) < 0.05
+
+
+def test_float32_int8_drift(reference):
+    for seed, (activations, _) in zip(SEEDS, reference, strict=True):
+        low, _ = _outputs(seed, dtype=np.float32, quantize=True)
+        assert np.abs(low - activations).max() < 0.1
+
+
+def test_batch_rows_are_thresholded_independently():
+    def predict(inputs):
+        network = SimpleNeuralNetwork(rng=np.random.default_rng(7))
+        with contextlib.redirect_stdout(io.StringIO()):
+            return network.predict_bits(inputs)
+
+    _, thresholds, bits = predict(INPUTS)
+    assert thresholds.shape == (len(INPUTS),)
+
+    # Row 0 comes out the same whatever the rest of the batch holds.
+    _, other_thresholds, other_bits = predict(
+        np.vstack([INPUTS[:1], np.full((5, 8), 0.9)])
+    )
+    assert other_thresholds[0] == thresholds[0]
+    assert np.array_equal(other_bits[0], bits[0])
+
+    # And the same as predicting it alone; the noise draws line up row by row.
+    _, threshold, single_bits = predict(INPUTS[0])
+    assert threshold == thresholds[0]
+    assert np.array_equal(single_bits, bits[0])
@@ -0,0 +1,26 @@
+"""Simulation results are keyed and ordered by the full measured register."""
+
+import numpy as np
+import pytest
+from qiskit import QuantumCircuit
+
+from quantum_circuit_qiskit import simulate_circuits
+
+
+@pytest.mark.parametrize("width", [2, 3, 4])
+def test_probabilities_cover_every_measured_state(width):
+    # An unused classical register adds a second group to every count key.
+    circuit = QuantumCircuit(width, width)
+    circuit.h(range(width))
+    circuit.measure_all()
+
+    (result,) = simulate_circuits([circuit], shots=4096, rng=np.random.default_rng(0))
+
+    states = [format(i, f"0{width}b") for i in range(2**width)]
+    assert list(result.probabilities) == states
+    assert len(result.probabilities_vector) == 2**width
+    assert sum(result.probabilities_vector) == pytest.approx(1)
+    for state, p in zip(states, result.probabilities_vector, strict=True):
+        shots = sum(n for key, n in result.counts.items() if key.split()[0] == state)
+        assert p == shots / 4096
+    assert result.dominant_state == int(np.argmax(result.probabilities_vector))
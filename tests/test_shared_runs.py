@@ -0,0 +1,17 @@
+"""The shared block is never unmapped under a live view."""
+
+import pytest
+
+from shared_runs import SharedRuns, run_dtype
+
+
+def test_close_refuses_while_views_are_alive():
+    shared = SharedRuns(4, run_dtype())
+    counts = shared.runs["counts"]
+    with pytest.raises(BufferError):
+        shared.close()
+    assert counts.sum() == 0  # still mapped
+
+    del counts
+    shared.close()
+    shared.close()  # a second close does nothing
@@ -0,0 +1,29 @@
+"""Streamed runs decode the action the pipeline would for the same draws."""
+
+import contextlib
+import io
+
+import numpy as np
+
+from nn import infer_current_action
+from quantum_circuit_qiskit import _result_from_counts
+from seeding import child, run_seeds
+from stream import iter_runs
+
+
+def test_stream_matches_pipeline_inference():
+    seed, width = 11, 3
+    master = np.random.SeedSequence(seed)
+    for record in iter_runs(64, seed=seed, chunk_size=16, shots=1024):
+        counts = {
+            format(state, f"0{width}b"): int(n)
+            for state, n in enumerate(record.counts)
+            if n
+        }
+        rng = np.random.default_rng(run_seeds(child(master, record.index)).network)
+        with contextlib.redirect_stdout(io.StringIO()):
+            readout = infer_current_action(_result_from_counts(counts), rng)
+
+        np.testing.assert_allclose(readout.activations, record.activations)
+        assert np.isclose(readout.threshold, record.threshold)
+        assert readout.index == record.action_index
@@ -0,0 +1,21 @@
+"""An interrupted sweep resumes where its completion markers stop."""
+
+from models.sweep import SweepSpec
+from sweep import Sweep
+
+
+def test_resume_redoes_only_unmarked_shards(tmp_path):
+    spec = SweepSpec(phis=[0.5], seed_count=3, shots=256, shard_size=1)
+    assert Sweep(tmp_path, spec).run() == 3
+    before = list(Sweep(tmp_path).records())
+
+    # A crash after the records were written but before the marker
+    (tmp_path / "shards" / "000001.done").unlink()
+
+    sweep = Sweep(tmp_path)
+    assert sweep.pending() == [1]
+    assert [r.index for r in sweep.records()] == [0, 2]
+    assert sweep.run() == 1
+    assert sweep.pending() == []
+    assert list(sweep.records()) == before
+    assert list((tmp_path / "shards").glob("*.lock")) == []